@@ -0,0 +1,41 @@
+"""add (parent, sort key DESC) indexes for ordered relationships
+
+Bar.history, Bar.transfers and ReconciliationSession.items are loaded with a
+default ORDER BY ... DESC. Matching composite indexes let Postgres read the
+children in order straight off the index instead of sorting per parent.
+
+Revision ID: a4d8e2f6c913
+Revises: f1c6d83e9a27
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2f6c913'
+down_revision: Union[str, None] = 'f1c6d83e9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_ownership_history_bar_date', 'ownership_history',
+        ['bar_id', sa.text('transfer_date DESC')],
+    )
+    op.create_index(
+        'ix_dealer_transfers_bar_date', 'dealer_location_transfers',
+        ['bar_id', sa.text('transferred_at DESC')],
+    )
+    op.create_index(
+        'ix_recon_items_session_id_desc', 'reconciliation_items',
+        ['session_id', sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_recon_items_session_id_desc', table_name='reconciliation_items')
+    op.drop_index('ix_dealer_transfers_bar_date', table_name='dealer_location_transfers')
+    op.drop_index('ix_ownership_history_bar_date', table_name='ownership_history')
@@ -0,0 +1,32 @@
+"""add partial index for reservable bars (reserve_bars candidate lookup)
+
+reserve_bars picks bars with FOR UPDATE SKIP LOCKED by product among
+sellable, unowned, Assigned bars. ix_bars_product_status still had to
+visit every Assigned row of the product (owned or not sellable too);
+this partial index holds only the rows the checkout can actually take.
+
+Revision ID: a6e0c3d7f189
+Revises: f5d9b2c6e078
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e0c3d7f189'
+down_revision: Union[str, None] = 'f5d9b2c6e078'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_bars_reservable', 'bars', ['product_id'],
+        postgresql_where=sa.text("status = 'Assigned' AND customer_id IS NULL AND is_sellable = true"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bars_reservable', table_name='bars')
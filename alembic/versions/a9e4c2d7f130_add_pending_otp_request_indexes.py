@@ -0,0 +1,37 @@
+"""add partial Pending indexes on OTP-backed transfer/delivery requests
+
+Ownership transfers and custodial delivery requests are looked up as "the
+Pending request for this bar" before issuing or verifying an OTP. Completed,
+cancelled and expired rows accumulate forever, so a partial index over
+Pending rows only stays tiny.
+
+Revision ID: a9e4c2d7f130
+Revises: f2d7a9b46e15
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9e4c2d7f130'
+down_revision: Union[str, None] = 'f2d7a9b46e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_bar_transfers_pending', 'bar_transfers', ['bar_id'],
+        postgresql_where=sa.text("status = 'Pending'"),
+    )
+    op.create_index(
+        'ix_custodial_delivery_pending', 'custodial_delivery_requests', ['bar_id'],
+        postgresql_where=sa.text("status = 'Pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_custodial_delivery_pending', table_name='custodial_delivery_requests')
+    op.drop_index('ix_bar_transfers_pending', table_name='bar_transfers')
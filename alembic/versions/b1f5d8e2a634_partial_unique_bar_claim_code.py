@@ -0,0 +1,32 @@
+"""make bars.claim_code unique index partial
+
+Only POS/gift bars carry a claim code; the rest are NULL. The full
+unique B-tree stored an entry for every bar. A partial unique index
+WHERE claim_code IS NOT NULL enforces the same uniqueness and still
+serves the equality lookup in the claim flow, at a fraction of the size.
+
+Revision ID: b1f5d8e2a634
+Revises: a9e4c2d7f130
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1f5d8e2a634'
+down_revision: Union[str, None] = 'a9e4c2d7f130'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('uq_bars_claim_code', 'bars', ['claim_code'], unique=True,
+                    postgresql_where=sa.text('claim_code IS NOT NULL'))
+    op.drop_index('ix_bars_claim_code', table_name='bars')
+
+
+def downgrade() -> None:
+    op.create_index('ix_bars_claim_code', 'bars', ['claim_code'], unique=True)
+    op.drop_index('uq_bars_claim_code', table_name='bars')
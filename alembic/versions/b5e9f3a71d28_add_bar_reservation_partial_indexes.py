@@ -0,0 +1,37 @@
+"""add partial indexes for active bar reservations
+
+release_expired_reservations() sweeps bars WHERE status = 'Reserved' AND
+reserved_until < now(). Only a handful of bars are reserved at any time, so
+partial indexes keep these lookups to the live reservations instead of a full
+B-tree over every bar (mostly NULLs).
+
+Revision ID: b5e9f3a71d28
+Revises: a4d8e2f6c913
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e9f3a71d28'
+down_revision: Union[str, None] = 'a4d8e2f6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_bars_reserved_active', 'bars', ['reserved_until'],
+        postgresql_where=sa.text("status = 'Reserved'"),
+    )
+    op.create_index(
+        'ix_bars_reserved_customer', 'bars', ['reserved_customer_id'],
+        postgresql_where=sa.text("reserved_customer_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bars_reserved_customer', table_name='bars')
+    op.drop_index('ix_bars_reserved_active', table_name='bars')
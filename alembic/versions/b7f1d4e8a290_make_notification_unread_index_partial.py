@@ -0,0 +1,33 @@
+"""make the notification unread index partial (is_read = false)
+
+ix_notification_user_unread indexed (user_id, is_read) for every row,
+although nearly all notifications end up read and the badge count only
+ever asks for the unread ones. A partial index on user_id for unread
+rows is a fraction of the size and serves the count as an index-only
+scan (and mark_all_read's UPDATE).
+
+Revision ID: b7f1d4e8a290
+Revises: a6e0c3d7f189
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f1d4e8a290'
+down_revision: Union[str, None] = 'a6e0c3d7f189'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_notification_user_unread_partial', 'notifications', ['user_id'],
+                    postgresql_where=sa.text('is_read = false'))
+    op.drop_index('ix_notification_user_unread', table_name='notifications')
+
+
+def downgrade() -> None:
+    op.create_index('ix_notification_user_unread', 'notifications', ['user_id', 'is_read'], unique=False)
+    op.drop_index('ix_notification_user_unread_partial', table_name='notifications')
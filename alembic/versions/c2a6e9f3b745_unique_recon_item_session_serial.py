@@ -0,0 +1,37 @@
+"""unique (session_id, serial_code) on reconciliation_items
+
+Lets the scan endpoint dedupe with INSERT ... ON CONFLICT DO NOTHING in
+one statement instead of SELECT-then-INSERT, and keeps concurrent scans
+of the same serial from both being recorded. Duplicates that slipped in
+before (racing scans) are removed first, keeping the earliest row.
+
+Revision ID: c2a6e9f3b745
+Revises: b1f5d8e2a634
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a6e9f3b745'
+down_revision: Union[str, None] = 'b1f5d8e2a634'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM reconciliation_items a
+        USING reconciliation_items b
+        WHERE a.session_id = b.session_id
+          AND a.serial_code = b.serial_code
+          AND a.id > b.id
+    """)
+    op.create_unique_constraint(
+        'uq_recon_item_session_serial', 'reconciliation_items', ['session_id', 'serial_code'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_recon_item_session_serial', 'reconciliation_items', type_='unique')
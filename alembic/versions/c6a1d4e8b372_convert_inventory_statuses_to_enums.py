@@ -0,0 +1,56 @@
+"""store inventory status/type columns as native Postgres ENUMs
+
+Follows bar_status: reconciliation session/item status, custodial delivery
+status, bar ownership-transfer status and dealer transfer type each hold a
+small fixed set of labels. Native enums are 4 bytes per row instead of a
+varchar and compare as integers.
+
+Revision ID: c6a1d4e8b372
+Revises: b5e9f3a71d28
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a1d4e8b372'
+down_revision: Union[str, None] = 'b5e9f3a71d28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, enum type, labels, pre-enum column type)
+COLUMNS = [
+    ('reconciliation_sessions', 'status', postgresql.ENUM(
+        'InProgress', 'Completed', 'Cancelled', name='reconciliation_status'), 'VARCHAR'),
+    ('reconciliation_items', 'item_status', postgresql.ENUM(
+        'Matched', 'Missing', 'Unexpected', name='reconciliation_item_status'), 'VARCHAR(20)'),
+    ('custodial_delivery_requests', 'status', postgresql.ENUM(
+        'Pending', 'Completed', 'Cancelled', 'Expired', name='custodial_delivery_status'), 'VARCHAR'),
+    ('bar_transfers', 'status', postgresql.ENUM(
+        'Pending', 'Completed', 'Cancelled', 'Expired', name='bar_transfer_status'), 'VARCHAR'),
+    ('dealer_location_transfers', 'transfer_type', postgresql.ENUM(
+        'Manual', 'AdminTransfer', 'Reconciliation', 'CustodialDelivery', 'Return',
+        'WarehouseDistribution', name='transfer_type'), 'VARCHAR(30)'),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for table, column, enum_type, _old_type in COLUMNS:
+        enum_type.create(bind, checkfirst=True)
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE {enum_type.name} USING {column}::{enum_type.name}"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table, column, enum_type, old_type in reversed(COLUMNS):
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE {old_type} USING {column}::text"
+        )
+        enum_type.drop(bind, checkfirst=True)
@@ -0,0 +1,36 @@
+"""reorder ix_notification_ref as (reference_id, reference_type), partial
+
+reference_type is a handful of literals ("order_paid", "cashback", ...)
+while reference_id is close to unique per type, so leading with it
+makes the index far more selective. Admin broadcasts, which are one row
+per user and the bulk of the table, carry no reference_id and are left
+out of the index entirely.
+
+reference_id stays a string: some ids are composite (e.g. delivery
+"<order_id>:<status>"), so an integer shadow column would not cover them.
+
+Revision ID: c8a2e5f9b3d1
+Revises: b7f1d4e8a290
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a2e5f9b3d1'
+down_revision: Union[str, None] = 'b7f1d4e8a290'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_notification_ref', table_name='notifications')
+    op.create_index('ix_notification_ref', 'notifications', ['reference_id', 'reference_type'],
+                    postgresql_where=sa.text('reference_id IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_ref', table_name='notifications')
+    op.create_index('ix_notification_ref', 'notifications', ['reference_type', 'reference_id'], unique=False)
@@ -0,0 +1,42 @@
+"""cache id sequences on high-insert inventory tables
+
+Location transfers and ownership history are written in bursts (bulk
+transfer, preorder generation). CACHE 1000 lets each backend take ids
+in blocks instead of hitting the shared sequence on every INSERT.
+Cached values a backend never uses are skipped, and ids from different
+connections are no longer ordered by insert time. Both tables are
+ordered by their own timestamp columns, never by id.
+
+reconciliation_items and bar_images are deliberately excluded because
+their ids must follow insert order: the scanner view and
+ix_recon_items_covering list the latest scan first by id DESC, and
+primary_image_path picks the lowest-id image.
+
+Revision ID: d3b7f0a4c856
+Revises: c2a6e9f3b745
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3b7f0a4c856'
+down_revision: Union[str, None] = 'c2a6e9f3b745'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = [
+    'dealer_location_transfers',
+    'ownership_history',
+]
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER SEQUENCE {table}_id_seq CACHE 1000")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"ALTER SEQUENCE {table}_id_seq CACHE 1")
@@ -0,0 +1,38 @@
+"""add denormalized primary_image_path to bars
+
+Bar.first_image loaded the whole bar_images collection to return one path.
+The first image's path is now stored on the bar itself (maintained by the
+inventory service) and backfilled here from the lowest-id image per bar.
+
+Revision ID: d7b2e5f94c81
+Revises: c6a1d4e8b372
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b2e5f94c81'
+down_revision: Union[str, None] = 'c6a1d4e8b372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('bars', sa.Column('primary_image_path', sa.String(), nullable=True))
+    op.execute("""
+        UPDATE bars b
+        SET primary_image_path = (
+            SELECT i.file_path FROM bar_images i
+            WHERE i.bar_id = b.id
+            ORDER BY i.id
+            LIMIT 1
+        )
+        WHERE EXISTS (SELECT 1 FROM bar_images i WHERE i.bar_id = b.id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('bars', 'primary_image_path')
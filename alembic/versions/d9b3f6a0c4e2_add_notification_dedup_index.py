@@ -0,0 +1,52 @@
+"""partial unique index deduplicating one-shot notifications
+
+A retried handler (e.g. payment callback, transfer confirm) could record
+the same event twice and send the SMS twice. For the one-shot reference
+types listed in NOTIFICATION_DEDUP_REFERENCE_TYPES there is now at most
+one row per (user, type, reference); send() inserts with ON CONFLICT DO
+NOTHING and skips the SMS when nothing was inserted. Existing duplicates
+are removed first, keeping the earliest row. The predicate is written
+out literally so this revision does not change if the list grows later.
+
+Revision ID: d9b3f6a0c4e2
+Revises: c8a2e5f9b3d1
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b3f6a0c4e2'
+down_revision: Union[str, None] = 'c8a2e5f9b3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEDUP_TYPES = (
+    "'order_paid', 'order_cancel', 'transfer_sent', 'transfer_received', "
+    "'dealer_request_approved', 'dealer_request_rejected'"
+)
+DEDUP_WHERE = f"reference_id IS NOT NULL AND reference_type IN ({DEDUP_TYPES})"
+
+
+def upgrade() -> None:
+    op.execute(f"""
+        DELETE FROM notifications a
+        USING notifications b
+        WHERE a.user_id = b.user_id
+          AND a.notification_type = b.notification_type
+          AND a.reference_type = b.reference_type
+          AND a.reference_id = b.reference_id
+          AND a.id > b.id
+          AND a.reference_type IN ({DEDUP_TYPES})
+    """)
+    op.create_index(
+        'uq_notification_dedup', 'notifications',
+        ['user_id', 'notification_type', 'reference_type', 'reference_id'],
+        unique=True, postgresql_where=sa.text(DEDUP_WHERE),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_notification_dedup', table_name='notifications')
@@ -0,0 +1,33 @@
+"""make the bars.dealer_id index partial (dealer_id IS NOT NULL)
+
+Raw bars (not yet at any dealer) carry a NULL dealer_id, yet the full
+ix_bars_dealer_id indexed them too. Every lookup on this column is an
+equality or a per-dealer GROUP BY, which never wants the NULL rows, so
+a partial index serves them all and lets the per-dealer count run as an
+index-only scan over a smaller index.
+
+Revision ID: e4c8a1b5d967
+Revises: d3b7f0a4c856
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c8a1b5d967'
+down_revision: Union[str, None] = 'd3b7f0a4c856'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_bars_dealer_id_notnull', 'bars', ['dealer_id'],
+                    postgresql_where=sa.text('dealer_id IS NOT NULL'))
+    op.drop_index('ix_bars_dealer_id', table_name='bars')
+
+
+def downgrade() -> None:
+    op.create_index('ix_bars_dealer_id', 'bars', ['dealer_id'], unique=False)
+    op.drop_index('ix_bars_dealer_id_notnull', table_name='bars')
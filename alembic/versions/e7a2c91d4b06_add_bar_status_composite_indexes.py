@@ -0,0 +1,31 @@
+"""add composite (status, fk) indexes on bars
+
+list_bars and the reservation path filter bars by status together with a
+dealer, customer or product. With only single-column FK indexes Postgres picks
+one and filters the rest row by row; these composites match the hot combos.
+
+Revision ID: e7a2c91d4b06
+Revises: d3f9a6b25c48
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c91d4b06'
+down_revision: Union[str, None] = 'd3f9a6b25c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_bars_status_dealer', 'bars', ['status', 'dealer_id'])
+    op.create_index('ix_bars_status_customer', 'bars', ['status', 'customer_id'])
+    op.create_index('ix_bars_product_status', 'bars', ['product_id', 'status'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bars_product_status', table_name='bars')
+    op.drop_index('ix_bars_status_customer', table_name='bars')
+    op.drop_index('ix_bars_status_dealer', table_name='bars')
@@ -0,0 +1,36 @@
+"""use COLLATE "C" for bar serial / claim codes
+
+Serial and claim codes are ASCII from a fixed alphabet, so locale-aware
+collation only slows comparisons down. Byte-wise "C" collation makes the
+unique B-tree lookups cheaper and lets the plain index serve LIKE 'ABC%'
+prefix scans. ALTER TYPE rebuilds the affected indexes.
+
+Revision ID: e8c3f6a05d92
+Revises: d7b2e5f94c81
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c3f6a05d92'
+down_revision: Union[str, None] = 'd7b2e5f94c81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = [
+    ('bars', 'serial_code', 'VARCHAR(8)'),
+    ('bars', 'claim_code', 'VARCHAR(8)'),
+    ('reconciliation_items', 'serial_code', 'VARCHAR(12)'),
+]
+
+
+def upgrade() -> None:
+    for table, column, col_type in COLUMNS:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE {col_type} COLLATE "C"')
+
+
+def downgrade() -> None:
+    for table, column, col_type in COLUMNS:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE {col_type} COLLATE "default"')
@@ -0,0 +1,32 @@
+"""store bars.status as a native Postgres ENUM
+
+bars.status only ever holds Raw/Assigned/Reserved/Sold. A native enum is 4
+bytes per row instead of a varchar, which also keeps the (status, ...)
+composite indexes denser. Existing indexes are rebuilt by ALTER TYPE.
+
+Revision ID: f1c6d83e9a27
+Revises: e7a2c91d4b06
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6d83e9a27'
+down_revision: Union[str, None] = 'e7a2c91d4b06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BAR_STATUS = postgresql.ENUM('Raw', 'Assigned', 'Reserved', 'Sold', name='bar_status')
+
+
+def upgrade() -> None:
+    BAR_STATUS.create(op.get_bind(), checkfirst=True)
+    op.execute("ALTER TABLE bars ALTER COLUMN status TYPE bar_status USING status::bar_status")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE bars ALTER COLUMN status TYPE VARCHAR USING status::text")
+    BAR_STATUS.drop(op.get_bind(), checkfirst=True)
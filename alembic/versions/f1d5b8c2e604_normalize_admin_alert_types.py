@@ -0,0 +1,34 @@
+"""strip NotificationType. prefixes from admin_alert_types
+
+Before the admin settings page iterated plain string values, its checkboxes
+rendered the str-enum members, so saving the form stored entries such as
+"NotificationType.ORDER_STATUS" in system_settings.admin_alert_types. Those
+never match the notification_type values compared at send time, which
+silently disabled the selected admin alerts. Rewrite them to plain values.
+
+Revision ID: f1d5b8c2e604
+Revises: d9b3f6a0c4e2
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1d5b8c2e604'
+down_revision: Union[str, None] = 'd9b3f6a0c4e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE system_settings "
+        "SET value = replace(value, 'NotificationType.', '') "
+        "WHERE key = 'admin_alert_types' AND value LIKE '%NotificationType.%'"
+    )
+
+
+def downgrade() -> None:
+    # Plain values are what every version of the code reads; nothing to restore
+    pass
@@ -0,0 +1,37 @@
+"""make the reconciliation item (session_id, id DESC) index covering
+
+Replaces ix_recon_items_session_id_desc with the same key plus INCLUDE
+(bar_id, serial_code, item_status, scanned_at), so per-session lookups that
+only need those columns (scanned bar ids, status counts) are index-only scans.
+
+Revision ID: f2d7a9b46e15
+Revises: e8c3f6a05d92
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d7a9b46e15'
+down_revision: Union[str, None] = 'e8c3f6a05d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_recon_items_covering', 'reconciliation_items',
+        ['session_id', sa.text('id DESC')],
+        postgresql_include=['bar_id', 'serial_code', 'item_status', 'scanned_at'],
+    )
+    op.drop_index('ix_recon_items_session_id_desc', table_name='reconciliation_items')
+
+
+def downgrade() -> None:
+    op.create_index(
+        'ix_recon_items_session_id_desc', 'reconciliation_items',
+        ['session_id', sa.text('id DESC')],
+    )
+    op.drop_index('ix_recon_items_covering', table_name='reconciliation_items')
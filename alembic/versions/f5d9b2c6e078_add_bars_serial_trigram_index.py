@@ -0,0 +1,33 @@
+"""trigram GIN index for bar serial substring search
+
+The admin bar list searches serial_code with ILIKE '%term%'; the leading
+wildcard rules out the B-tree, so every search was a sequential scan of
+bars. A pg_trgm GIN index answers LIKE/ILIKE substring matches directly
+(for terms of 3+ characters; shorter terms fall back to a scan as before).
+
+Revision ID: f5d9b2c6e078
+Revises: e4c8a1b5d967
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5d9b2c6e078'
+down_revision: Union[str, None] = 'e4c8a1b5d967'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_bars_serial_trgm', 'bars', ['serial_code'],
+        postgresql_using='gin', postgresql_ops={'serial_code': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    # The extension is left installed; other objects may depend on it
+    op.drop_index('ix_bars_serial_trgm', table_name='bars')
@@ -4,6 +4,7 @@ TalaMala v4 - Shared Helpers
 Pure utility functions with NO database or module dependencies.
 """
 
+import re
 import secrets
 from datetime import datetime, timezone
 from decimal import Decimal
@@ -37,6 +38,22 @@ def safe_decimal(value: Optional[str], default: Optional[Decimal] = None) -> Opt
         return default
 
 
+# One comma-separated token that is purely ASCII digits (surrounding spaces allowed)
+_ID_TOKEN_RE = re.compile(r"(?:^|(?<=,))\s*(\d+)\s*(?=,|$)", re.ASCII)
+
+
+def parse_id_list(value: Optional[str]) -> list[int]:
+    """Parse a comma-separated id list (e.g. bulk-select form field).
+
+    Non-numeric tokens are skipped and duplicates dropped (order preserved).
+    The scan runs in the C regex engine, which matters for multi-thousand
+    id selections.
+    """
+    if not value:
+        return []
+    return list(dict.fromkeys(map(int, _ID_TOKEN_RE.findall(value))))
+
+
 def format_toman(value) -> str:
     """Format Rial value as Toman with comma separators. (Rial ÷ 10 = Toman)"""
     if value is None:
@@ -70,6 +87,15 @@ def get_real_ip(request) -> str:
     return request.client.host
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value covers the given ETag.
+    Uses weak comparison (W/ ignored on both sides), as RFC 9110 requires for GET."""
+    if not if_none_match:
+        return False
+    candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
 # ==========================================
 # Jalali Date & Persian Number Filters
 # ==========================================
@@ -164,10 +164,23 @@ def new_csrf_token(request: Request = None) -> str:
     return secrets.token_urlsafe(32)
 
 
+def set_csrf_cookie(response, request: Request, token: str):
+    """Set the csrf_token cookie only when the token was freshly minted.
+
+    new_csrf_token() reuses the inbound cookie, so re-sending the same value
+    on every page only adds a Set-Cookie header.
+    """
+    if request.cookies.get("csrf_token") != token:
+        response.set_cookie("csrf_token", token, httponly=True, samesite="lax")
+
+
 def csrf_check(request: Request, form_token: Optional[str] = None):
     """
     Verify CSRF token from cookie matches the one in header or form.
     Raises HTTPException(403) on mismatch.
+
+    Stateless double-submit: pure CPU, no session/DB lookup. Comparison is
+    constant-time so the token cannot be probed byte-by-byte.
     """
     if not CSRF_ENABLED:
         return
@@ -176,5 +189,7 @@ def csrf_check(request: Request, form_token: Optional[str] = None):
     header_token = request.headers.get("X-CSRF-Token")
     token = header_token or form_token
 
-    if not cookie_token or not token or cookie_token != token:
+    if not cookie_token or not token or not hmac.compare_digest(
+        cookie_token.encode("utf-8"), token.encode("utf-8")
+    ):
         raise HTTPException(403, "CSRF token missing or invalid")
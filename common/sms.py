@@ -7,6 +7,8 @@ Default provider: sms.ir
 """
 
 import logging
+from typing import List, Union
+
 import requests
 import urllib3
 
@@ -22,6 +24,9 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger("talamala.sms")
 
+# Receptors per provider call for same-text bulk sends (both APIs accept lists)
+SMS_BULK_BATCH = 100
+
 if not SMSIR_API_KEY and not SMS_API_KEY:
     logger.warning("No SMS API keys configured - SMS sending disabled")
 
@@ -220,6 +225,27 @@ class SmsSender:
         else:
             return self._send_smsir_bulk_text(receptor, message)
 
+    def send_plain_text_bulk(self, receptors: List[str], message: str) -> bool:
+        """
+        Send the same plain-text SMS to many receptors (broadcasts).
+        One provider lookup, then one API call per SMS_BULK_BATCH receptors
+        instead of one call per receptor. Returns True if every batch succeeded.
+        """
+        if not receptors:
+            return True
+        logger.warning(f"[SMS] NOTIFICATION BULK | To: {len(receptors)} receptors | Text: {message}")
+
+        provider = _get_active_provider()
+
+        ok = True
+        for i in range(0, len(receptors), SMS_BULK_BATCH):
+            batch = receptors[i:i + SMS_BULK_BATCH]
+            if provider == "kavenegar":
+                ok = self._send_kavenegar_direct(",".join(batch), message) and ok
+            else:
+                ok = self._send_smsir_bulk_text(batch, message) and ok
+        return ok
+
     def _send_kavenegar_direct(self, receptor: str, message: str) -> bool:
         """Send plain text via Kavenegar Send API."""
         if not SMS_API_KEY:
@@ -238,8 +264,8 @@ class SmsSender:
             logger.error(f"Kavenegar direct failed: {e}")
             return False
 
-    def _send_smsir_bulk_text(self, receptor: str, message: str) -> bool:
-        """Send plain text via sms.ir Bulk API."""
+    def _send_smsir_bulk_text(self, receptor: Union[str, List[str]], message: str) -> bool:
+        """Send plain text via sms.ir Bulk API (one mobile or a list)."""
         if not SMSIR_API_KEY:
             logger.warning("SMS skipped: no sms.ir API key")
             return False
@@ -253,7 +279,7 @@ class SmsSender:
             payload = {
                 "lineNumber": int(SMSIR_LINE_NUMBER),
                 "messageText": message,
-                "mobiles": [receptor],
+                "mobiles": receptor if isinstance(receptor, list) else [receptor],
             }
             response = requests.post(url, json=payload, headers=headers, timeout=10)
             data = response.json()
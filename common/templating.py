@@ -92,6 +92,26 @@ templates.env.globals["STATIC_VER"] = STATIC_VERSION
 # Globals (usage in template: {{ get_setting_value('key') }})
 templates.env.globals["get_setting_value"] = get_setting_value
 
+
+def register_model_globals() -> None:
+    """
+    Expose inventory status label/color maps for hot per-row loops
+    (usage in template: {{ BAR_STATUS_LABELS.get(bar.status, bar.status) }}).
+    Called from main.py once all models are imported.
+    """
+    # Import here to avoid circular imports at module load time
+    from modules.inventory.models import (
+        BAR_STATUS_LABELS, BAR_STATUS_COLORS,
+        RECONCILIATION_ITEM_STATUS_LABELS, RECONCILIATION_ITEM_STATUS_COLORS,
+    )
+    templates.env.globals.update(
+        BAR_STATUS_LABELS=BAR_STATUS_LABELS,
+        BAR_STATUS_COLORS=BAR_STATUS_COLORS,
+        RECON_ITEM_LABELS=RECONCILIATION_ITEM_STATUS_LABELS,
+        RECON_ITEM_COLORS=RECONCILIATION_ITEM_STATUS_COLORS,
+    )
+
+
 # BASE_URL for SEO templates (og:url, canonical, JSON-LD)
 from config.settings import BASE_URL
 templates.env.globals["BASE_URL"] = BASE_URL
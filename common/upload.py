@@ -17,6 +17,9 @@ from config.settings import (
     PRIVATE_UPLOAD_DIR, ALLOWED_DOCUMENT_EXTENSIONS,
 )
 
+# Chunk size for streaming uploads to disk (shutil's Windows default is 1 MiB)
+UPLOAD_COPY_CHUNK = 64 * 1024
+
 
 def save_upload_file(
     upload_file: UploadFile,
@@ -100,8 +103,9 @@ def save_document_file(upload_file: UploadFile, subfolder: str = "") -> Optional
 
     file_path = os.path.join(target_dir, f"{uuid.uuid4().hex}{ext}")
     try:
-        with open(file_path, "wb") as out:
-            shutil.copyfileobj(upload_file.file, out)
+        # Stream in fixed chunks straight to the fd: O(1) memory for any upload size
+        with open(file_path, "wb", buffering=0) as out:
+            shutil.copyfileobj(upload_file.file, out, UPLOAD_COPY_CHUNK)
         return file_path.replace("\\", "/")
     except Exception as e:
         print(f"Document Save Error: {e}")
@@ -1,21 +1,23 @@
 """
 TalaMala v4 - Database Configuration
 =====================================
-Engine, SessionLocal, Base, and get_db dependency.
+Engine, SessionLocal, Base, and get_db / get_read_db / get_list_db dependencies.
 All models across all modules inherit from this Base.
 """
 
+from fastapi import Depends, Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from config.settings import DATABASE_URL
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from config.settings import DATABASE_URL, READ_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW
 
 engine = create_engine(
     DATABASE_URL,
-    pool_size=20,
-    max_overflow=40,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
     pool_timeout=30,
     pool_recycle=1800,  # Refresh connections every 30 minutes
     pool_pre_ping=True,  # Test connection health before each use
+    pool_use_lifo=True,  # Reuse the most recent connection; idle extras age out
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -30,3 +32,49 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+if READ_DATABASE_URL:
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        # Belt and braces: a misrouted write fails instead of hitting the replica
+        connect_args={"options": "-c default_transaction_read_only=on"},
+    )
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+    def get_read_db():
+        """FastAPI dependency: read-only session on the replica (DB_READ_HOST)."""
+        db = ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+else:
+    ReadSessionLocal = None
+
+    # No replica configured: same callable as get_db, so FastAPI's per-request
+    # dependency cache hands the route the one primary session it already has.
+    get_read_db = get_db
+
+
+def get_list_db(request: Request, db: Session = Depends(get_db)):
+    """FastAPI dependency for list pages that are also post-write redirect targets.
+
+    Uses the replica only for plain browsing. When the URL carries a flash
+    (?msg= / ?error=) the page is being shown right after a write, so it
+    reads from the primary to avoid showing stale rows under the message.
+    """
+    if ReadSessionLocal is None or "msg" in request.query_params or "error" in request.query_params:
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
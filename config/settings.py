@@ -27,6 +27,17 @@ if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Optional streaming read replica for read-only admin listings (same credentials)
+DB_READ_HOST = os.getenv("DB_READ_HOST")
+READ_DATABASE_URL = (
+    f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_READ_HOST}:{DB_PORT}/{DB_NAME}"
+    if DB_READ_HOST else None
+)
+
+# Connection pool (per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+
 
 # ==========================================
 # 🔐 Security
@@ -124,6 +124,10 @@ from modules.blog.models import (  # noqa: F401
 )
 from modules.pay_link.models import PaymentLink  # noqa: F401
 
+# Template globals that reference model constants
+from common.templating import register_model_globals
+register_model_globals()
+
 # ==========================================
 # Import routers
 # ==========================================
@@ -296,6 +300,8 @@ async def lifespan(app):
     yield
     scheduler.shutdown()
     scheduler_logger.info("Background scheduler stopped")
+    from modules.verification.service import shutdown_qr_pool
+    shutdown_qr_pool()
 
 
 # ==========================================
@@ -372,7 +378,11 @@ async def no_cache_admin(request: Request, call_next):
     if any(path.startswith(p) for p in _NO_CACHE_PREFIXES):
         ct = response.headers.get("content-type", "")
         if "text/html" in ct or "application/json" in ct:
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            if "etag" in response.headers:
+                # Validator-backed page: browser may keep it but must revalidate (304) each time
+                response.headers["Cache-Control"] = "private, no-cache, must-revalidate"
+            else:
+                response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
             response.headers["Pragma"] = "no-cache"
             response.headers["Expires"] = "0"
     return response
@@ -417,6 +427,11 @@ _SENSITIVE_KEYS = _re.compile(
 
 def _identify_user(request: Request):
     """Identify user from JWT cookie. Returns (user_type, user_display, user_id)."""
+    # Already resolved by the auth dependency during this request — no extra query
+    identity = getattr(request.state, "auth_identity", None)
+    if identity:
+        return identity
+
     from common.security import decode_token
 
     token = request.cookies.get("auth_token")
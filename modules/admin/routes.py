@@ -16,7 +16,7 @@ from modules.auth.deps import require_permission
 from modules.admin.models import SystemSetting, RequestLog
 from modules.pricing.models import Asset, GOLD_18K, SILVER
 from modules.pricing.service import update_asset_price
-from modules.notification.models import NOTIFICATION_TYPE_LABELS
+from modules.notification.models import NOTIFICATION_TYPE_LABELS_BY_VALUE
 
 router = APIRouter(tags=["admin-settings"])
 
@@ -41,7 +41,7 @@ async def settings_page(request: Request, db: Session = Depends(get_db), user=De
         "settings": settings_dict,
         "assets": assets_dict,
         "trade_status": trade_status,
-        "notification_types": NOTIFICATION_TYPE_LABELS,
+        "notification_types": NOTIFICATION_TYPE_LABELS_BY_VALUE,
         "csrf_token": csrf,
         "active_page": "settings",
     })
@@ -5,6 +5,11 @@ FastAPI dependencies for user authentication and authorization.
 These are injected into route handlers via Depends().
 
 NOTE: Unified auth — single User model, single auth_token cookie.
+
+Only get_current_active_user touches the DB (once per request — FastAPI caches
+it across nested dependencies). The role/permission checks layered on top are
+pure Python and declared `async def` so they run inline on the event loop
+instead of being dispatched to the threadpool.
 """
 
 from fastapi import Request, Depends, HTTPException, status
@@ -33,17 +38,27 @@ def get_current_active_user(request: Request, db: Session = Depends(get_db)):
         return None
 
     user = db.query(User).filter(User.mobile == mobile, User.is_active == True).first()
+    if user:
+        # Plain values (not the ORM object) so request_logger can reuse them
+        # after the request session is closed, instead of re-querying.
+        if user.is_admin:
+            user_type = user.admin_role or "admin"
+        elif user.is_dealer:
+            user_type = "dealer"
+        else:
+            user_type = "customer"
+        request.state.auth_identity = (user_type, mobile, user.id)
     return user
 
 
-def require_login(user=Depends(get_current_active_user)):
+async def require_login(user=Depends(get_current_active_user)):
     """Require any authenticated active user (customer, dealer, or admin). Raises 401 if not logged in."""
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="login_required")
     return user
 
 
-def require_staff(user=Depends(get_current_active_user)):
+async def require_staff(user=Depends(get_current_active_user)):
     """Only allow staff/admin users. 401 if not logged in, 403 if not admin."""
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="login_required")
@@ -52,7 +67,7 @@ def require_staff(user=Depends(get_current_active_user)):
     return user
 
 
-def require_operator_or_admin(user=Depends(get_current_active_user)):
+async def require_operator_or_admin(user=Depends(get_current_active_user)):
     """Allow both Admins and Operators. 401 if not logged in, 403 if not admin."""
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="login_required")
@@ -61,7 +76,7 @@ def require_operator_or_admin(user=Depends(get_current_active_user)):
     return user
 
 
-def require_dealer(user=Depends(get_current_active_user)):
+async def require_dealer(user=Depends(get_current_active_user)):
     """Only allow dealer users. 401 if not logged in, 403 if not dealer."""
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="login_required")
@@ -70,7 +85,7 @@ def require_dealer(user=Depends(get_current_active_user)):
     return user
 
 
-def require_super_admin(user=Depends(get_current_active_user)):
+async def require_super_admin(user=Depends(get_current_active_user)):
     """Only allow full Admins (not operators). 401 if not logged in, 403 if not super admin."""
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="login_required")
@@ -100,7 +115,7 @@ def require_permission(*perm_keys: str, level: str = "view"):
     """
     from modules.admin.permissions import PERMISSION_REGISTRY, PERMISSION_LEVEL_LABELS
 
-    def dependency(user=Depends(get_current_active_user)):
+    async def dependency(user=Depends(get_current_active_user)):
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="login_required")
         if not user.is_admin:
@@ -16,7 +16,7 @@ from modules.user.models import User
 from modules.dealer.models import (
     DealerSale, BuybackRequest, BuybackStatus, SubDealerRelation,
 )
-from modules.inventory.models import Bar, BarStatus, OwnershipHistory
+from modules.inventory.models import Bar, BarStatus, BAR_STATUS_VALUES, OwnershipHistory, enum_eq
 from modules.catalog.models import ProductTierWage
 from modules.pricing.service import get_end_customer_wage, get_dealer_margin, get_product_pricing, get_price_value
 from common.helpers import now_utc, generate_unique_claim_code
@@ -1633,7 +1633,7 @@ class DealerService:
         if metal_type:
             q = q.join(Product, Bar.product_id == Product.id).filter(Product.metal_type == metal_type)
         if status_filter:
-            q = q.filter(Bar.status == status_filter)
+            q = q.filter(enum_eq(Bar.status, status_filter, BAR_STATUS_VALUES))
 
         total = q.count()
         bars = (
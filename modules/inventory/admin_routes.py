@@ -4,6 +4,7 @@ Inventory Module - Admin Routes
 Bar management: list, generate, edit, update, bulk actions, image management.
 """
 
+import hashlib
 import urllib.parse
 from typing import List, Optional
 
@@ -11,10 +12,10 @@ from fastapi import APIRouter, Request, Depends, Form, File, UploadFile, HTTPExc
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
 from sqlalchemy.orm import Session
 
-from config.database import get_db
+from config.database import get_db, get_list_db
 from common.templating import templates
 from common.security import csrf_check, new_csrf_token
-from common.helpers import safe_int, generate_unique_claim_code
+from common.helpers import safe_int, parse_id_list, generate_unique_claim_code, etag_matches
 from modules.auth.deps import require_permission
 from modules.inventory.models import BarStatus
 from modules.inventory.service import inventory_service
@@ -46,9 +47,10 @@ async def list_bars(
     dealer_id: str = Query(None),
     tier_id: str = Query(None),
     sellable: str = Query(None),
+    after: str = Query(None),
     msg: str = Query(None),
     error: str = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_list_db),
     user=Depends(require_permission("inventory")),
 ):
     _customer_id = safe_int(customer_id)
@@ -58,10 +60,10 @@ async def list_bars(
     _status = status if status else None
     _sellable = {"1": True, "0": False}.get(sellable)
 
-    bars, total, total_pages = inventory_service.list_bars(
+    bars, total, total_pages, next_cursor = inventory_service.list_bars(
         db, page=page, search=search or None, customer_id=_customer_id,
         status=_status, product_id=_product_id, dealer_id=_dealer_id,
-        dealer_tier_id=_tier_id, is_sellable=_sellable,
+        dealer_tier_id=_tier_id, is_sellable=_sellable, after_id=safe_int(after),
     )
 
     filter_customer = None
@@ -81,6 +83,7 @@ async def list_bars(
         page=page,
         total=total,
         total_pages=total_pages,
+        next_cursor=next_cursor,
         search=search or "",
         filter_customer=filter_customer,
         status_filter=status or "",
@@ -101,6 +104,14 @@ async def list_bars(
         error=error,
     )
     response = templates.TemplateResponse("admin/inventory/bars.html", data)
+
+    # Body-hash ETag: re-opening an unchanged listing costs a bodiless 304
+    # instead of re-sending the full table (still always fresh — no-cache).
+    etag = '"%s"' % hashlib.blake2b(response.body, digest_size=8).hexdigest()
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     response.set_cookie("csrf_token", csrf, httponly=True, samesite="lax")
     return response
 
@@ -219,7 +230,8 @@ async def update_bar(
         db.rollback()
         msg = urllib.parse.quote(str(e))
         return RedirectResponse(f"/admin/bars/edit/{bar_id}?error={msg}", status_code=303)
-    return RedirectResponse("/admin/bars", status_code=303)
+    msg = urllib.parse.quote("تغییرات شمش ذخیره شد")
+    return RedirectResponse(f"/admin/bars?msg={msg}", status_code=303)
 
 
 # ==========================================
@@ -242,10 +254,7 @@ async def bulk_action(
 ):
     csrf_check(request, csrf_token)
 
-    try:
-        ids = [int(i) for i in selected_ids.split(",") if i.strip().isdigit()]
-    except Exception:
-        ids = []
+    ids = parse_id_list(selected_ids)
 
     if not ids:
         msg = urllib.parse.quote("هیچ موردی انتخاب نشده")
@@ -311,6 +320,7 @@ async def delete_bar_image(
 
 @router.get("/admin/bars/{bar_id}/qr")
 async def download_bar_qr(
+    request: Request,
     bar_id: int,
     db: Session = Depends(get_db),
     user=Depends(require_permission("inventory")),
@@ -318,18 +328,25 @@ async def download_bar_qr(
     """Generate high-res QR code PNG on-the-fly for a bar (for laser printing).
 
     SECURITY: Never saved to disk — generated per-request behind auth.
+    Conditional requests (If-None-Match) get a 304 without re-rendering.
     """
     bar = inventory_service.get_by_id(db, bar_id)
     if not bar:
         raise HTTPException(404)
 
     from modules.verification.service import verification_service
-    png_bytes = verification_service.generate_qr_for_print(bar.serial_code)
+    etag = verification_service.qr_etag(bar.serial_code)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    png_bytes = await verification_service.render_qr_for_print(bar.serial_code)
 
+    headers["Content-Disposition"] = f'inline; filename="QR_{bar.serial_code}.png"'
     return Response(
         content=png_bytes,
         media_type="image/png",
-        headers={"Content-Disposition": f'inline; filename="QR_{bar.serial_code}.png"'},
+        headers=headers,
     )
 
 
@@ -12,8 +12,9 @@ CustodialDeliveryRequest: Customer-initiated physical delivery of custodial bars
 import enum
 from sqlalchemy import (
     Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Numeric,
-    UniqueConstraint,
+    UniqueConstraint, Index, Enum as SAEnum, DDL, event, text, or_, false,
 )
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config.database import Base
@@ -30,6 +31,37 @@ class BarStatus(str, enum.Enum):
     SOLD = "Sold"          # فروخته شده
 
 
+# Stored as the native Postgres ENUM `bar_status` (4 bytes/row, compact indexes).
+# Python still reads/writes plain strings, so BarStatus members compare as before.
+# The other status/type columns in this module follow the same pattern.
+BAR_STATUS_VALUES = tuple(s.value for s in BarStatus)
+
+
+def enum_eq(column, value, allowed):
+    """Filter `column == value` for a native ENUM column.
+
+    Postgres raises on a value that is not an enum label, so an unknown value
+    (e.g. a stale status filter from a query string) becomes an always-false
+    condition instead: it matches nothing. `allowed` is the column's *_VALUES tuple.
+    """
+    return column == value if value in allowed else false()
+
+# Persian label / badge color per status (built once, read per row in list views)
+BAR_STATUS_LABELS = {
+    BarStatus.RAW: "خام",
+    BarStatus.ASSIGNED: "اختصاص",
+    BarStatus.RESERVED: "رزرو",
+    BarStatus.SOLD: "فروخته",
+}
+
+BAR_STATUS_COLORS = {
+    BarStatus.RAW: "secondary",
+    BarStatus.ASSIGNED: "info",
+    BarStatus.RESERVED: "warning",
+    BarStatus.SOLD: "success",
+}
+
+
 # ==========================================
 # Transfer Type (reason for physical bar movement)
 # ==========================================
@@ -43,6 +75,28 @@ class TransferType(str, enum.Enum):
     WAREHOUSE_DISTRIBUTION = "WarehouseDistribution"  # توزیع از مرکز پخش به نماینده
 
 
+TRANSFER_TYPE_VALUES = tuple(t.value for t in TransferType)
+
+# Persian label / badge color per transfer type
+TRANSFER_TYPE_LABELS = {
+    TransferType.MANUAL: "دستی",
+    TransferType.ADMIN_TRANSFER: "انتقال ادمین",
+    TransferType.RECONCILIATION: "تعدیل انبارگردانی",
+    TransferType.CUSTODIAL_DELIVERY: "تحویل امانی",
+    TransferType.RETURN: "بازگشت به انبار",
+    TransferType.WAREHOUSE_DISTRIBUTION: "توزیع مرکز پخش",
+}
+
+TRANSFER_TYPE_COLORS = {
+    TransferType.MANUAL: "secondary",
+    TransferType.ADMIN_TRANSFER: "info",
+    TransferType.RECONCILIATION: "warning",
+    TransferType.CUSTODIAL_DELIVERY: "success",
+    TransferType.RETURN: "danger",
+    TransferType.WAREHOUSE_DISTRIBUTION: "primary",
+}
+
+
 # ==========================================
 # Bar
 # ==========================================
@@ -51,8 +105,10 @@ class Bar(Base):
     __tablename__ = "bars"
 
     id = Column(Integer, primary_key=True, index=True)
-    serial_code = Column(String(8), unique=True, index=True, nullable=False)
-    status = Column(String, default=BarStatus.RAW, nullable=False)
+    # COLLATE "C": codes are ASCII, so byte-wise comparison (no locale rules) is
+    # both correct and the cheapest for the unique index and prefix scans
+    serial_code = Column(String(8, collation="C"), unique=True, index=True, nullable=False)
+    status = Column(SAEnum(*BAR_STATUS_VALUES, name="bar_status"), default=BarStatus.RAW, nullable=False)
 
     # Foreign keys to catalog + user
     product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True, index=True)
@@ -61,10 +117,10 @@ class Bar(Base):
     # The legacy single `batch_id` column still exists in the DB but is no longer read or written.
 
     # Dealer/warehouse tracking (dealer IS the location)
-    dealer_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    dealer_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
     # Claim code (for POS sales and gift orders)
-    claim_code = Column(String(8), unique=True, nullable=True, index=True)
+    claim_code = Column(String(8, collation="C"), nullable=True)
 
     # Reservation fields
     reserved_customer_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
@@ -82,22 +138,30 @@ class Bar(Base):
     # Site inventory count == number of sellable bars. Opt-in: new bars are NOT sellable.
     is_sellable = Column(Boolean, default=False, server_default="false", nullable=False, index=True)
 
+    # Denormalized path of the first (lowest-id) BarImage, kept in sync by
+    # inventory_service.update_bar / delete_image so first_image needs no collection load
+    primary_image_path = Column(String, nullable=True)
+
     # Relationships
     product = relationship("Product", foreign_keys=[product_id])
     customer = relationship("User", foreign_keys=[customer_id])
     dealer_location = relationship("User", foreign_keys=[dealer_id])
 
-    batch_links = relationship("BarBatchLink", back_populates="bar", cascade="all, delete-orphan")
+    # Child FKs are ON DELETE CASCADE, so passive_deletes lets Postgres remove them
+    # instead of the ORM SELECTing every child row before deleting a bar.
+    batch_links = relationship("BarBatchLink", back_populates="bar", cascade="all, delete-orphan",
+                               passive_deletes=True)
 
-    images = relationship("BarImage", back_populates="bar", cascade="all, delete-orphan")
+    images = relationship("BarImage", back_populates="bar", cascade="all, delete-orphan",
+                          passive_deletes=True)
     history = relationship("OwnershipHistory", back_populates="bar", cascade="all, delete-orphan",
-                          order_by="OwnershipHistory.transfer_date.desc()")
+                          passive_deletes=True, order_by="OwnershipHistory.transfer_date.desc()")
     transfers = relationship("DealerTransfer", back_populates="bar", cascade="all, delete-orphan",
-                            order_by="DealerTransfer.transferred_at.desc()")
+                            passive_deletes=True, order_by="DealerTransfer.transferred_at.desc()")
 
     @property
     def first_image(self):
-        return self.images[0].file_path if self.images else None
+        return self.primary_image_path
 
     @property
     def batches(self):
@@ -116,28 +180,47 @@ class Bar(Base):
 
     @property
     def status_label(self) -> str:
-        labels = {
-            BarStatus.RAW: "خام",
-            BarStatus.ASSIGNED: "اختصاص",
-            BarStatus.RESERVED: "رزرو",
-            BarStatus.SOLD: "فروخته",
-        }
-        return labels.get(self.status, self.status)
+        return BAR_STATUS_LABELS.get(self.status, self.status)
 
     @property
     def status_color(self) -> str:
-        colors = {
-            BarStatus.RAW: "secondary",
-            BarStatus.ASSIGNED: "info",
-            BarStatus.RESERVED: "warning",
-            BarStatus.SOLD: "success",
-        }
-        return colors.get(self.status, "secondary")
+        return BAR_STATUS_COLORS.get(self.status, "secondary")
+
+    # Composite indexes for the hot admin/reservation filter combinations
+    __table_args__ = (
+        Index("ix_bars_status_dealer", "status", "dealer_id"),
+        Index("ix_bars_status_customer", "status", "customer_id"),
+        Index("ix_bars_product_status", "product_id", "status"),
+        # Partial: only live reservations (a tiny slice of bars) — expiry sweep
+        Index("ix_bars_reserved_active", "reserved_until",
+              postgresql_where=text("status = 'Reserved'")),
+        # Partial: FK ON DELETE SET NULL lookup without indexing the NULL majority
+        Index("ix_bars_reserved_customer", "reserved_customer_id",
+              postgresql_where=text("reserved_customer_id IS NOT NULL")),
+        # Partial: raw bars have no dealer; equality lookups and the per-dealer
+        # count never need the NULL rows
+        Index("ix_bars_dealer_id_notnull", "dealer_id",
+              postgresql_where=text("dealer_id IS NOT NULL")),
+        # Partial: reserve_bars candidates (sellable, unowned, at a dealer) per product;
+        # shrinks as stock sells, so SKIP LOCKED picks touch only a few pages
+        Index("ix_bars_reservable", "product_id",
+              postgresql_where=text("status = 'Assigned' AND customer_id IS NULL AND is_sellable = true")),
+        # Partial unique: only POS/gift bars carry a claim code
+        Index("uq_bars_claim_code", "claim_code", unique=True,
+              postgresql_where=text("claim_code IS NOT NULL")),
+        # Trigram GIN: serves the admin list's substring search (ILIKE '%x%')
+        Index("ix_bars_serial_trgm", "serial_code", postgresql_using="gin",
+              postgresql_ops={"serial_code": "gin_trgm_ops"}),
+    )
 
     def __repr__(self):
         return f"<Bar {self.serial_code} ({self.status})>"
 
 
+# gin_trgm_ops needs pg_trgm before create_all() builds the bars table on a fresh DB
+event.listen(Bar.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
 # ==========================================
 # Bar ↔ Batch (M2M Junction)
 # ==========================================
@@ -187,10 +270,15 @@ class OwnershipHistory(Base):
     transfer_date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     description = Column(String, nullable=True)
 
-    bar = relationship("Bar", back_populates="history")
+    bar = relationship("Bar", back_populates="history", lazy="selectin")
     previous_owner = relationship("User", foreign_keys=[previous_owner_id])
     new_owner = relationship("User", foreign_keys=[new_owner_id])
 
+    # Serves Bar.history (ordered newest-first) without a sort step
+    __table_args__ = (
+        Index("ix_ownership_history_bar_date", "bar_id", transfer_date.desc()),
+    )
+
 
 # ==========================================
 # Dealer Transfer History (bar movement between dealers/warehouses)
@@ -208,37 +296,26 @@ class DealerTransfer(Base):
     description = Column(String, nullable=True)       # توضیح: "ارسال با پست پیشتاز"
 
     # Phase 22: structured transfer audit
-    transfer_type = Column(String(30), default=TransferType.MANUAL, nullable=False)
+    transfer_type = Column(SAEnum(*TRANSFER_TYPE_VALUES, name="transfer_type"), default=TransferType.MANUAL, nullable=False)
     reference_type = Column(String(50), nullable=True)   # e.g. "reconciliation_session", "gold_order"
     reference_id = Column(Integer, nullable=True)         # ID of the referenced entity
 
-    bar = relationship("Bar", back_populates="transfers")
+    bar = relationship("Bar", back_populates="transfers", lazy="selectin")
     from_dealer = relationship("User", foreign_keys=[from_dealer_id])
     to_dealer = relationship("User", foreign_keys=[to_dealer_id])
 
+    # Serves Bar.transfers (ordered newest-first) without a sort step
+    __table_args__ = (
+        Index("ix_dealer_transfers_bar_date", "bar_id", transferred_at.desc()),
+    )
+
     @property
     def transfer_type_label(self) -> str:
-        labels = {
-            TransferType.MANUAL: "دستی",
-            TransferType.ADMIN_TRANSFER: "انتقال ادمین",
-            TransferType.RECONCILIATION: "تعدیل انبارگردانی",
-            TransferType.CUSTODIAL_DELIVERY: "تحویل امانی",
-            TransferType.RETURN: "بازگشت به انبار",
-            TransferType.WAREHOUSE_DISTRIBUTION: "توزیع مرکز پخش",
-        }
-        return labels.get(self.transfer_type, str(self.transfer_type))
+        return TRANSFER_TYPE_LABELS.get(self.transfer_type) or str(self.transfer_type)
 
     @property
     def transfer_type_color(self) -> str:
-        colors = {
-            TransferType.MANUAL: "secondary",
-            TransferType.ADMIN_TRANSFER: "info",
-            TransferType.RECONCILIATION: "warning",
-            TransferType.CUSTODIAL_DELIVERY: "success",
-            TransferType.RETURN: "danger",
-            TransferType.WAREHOUSE_DISTRIBUTION: "primary",
-        }
-        return colors.get(self.transfer_type, "secondary")
+        return TRANSFER_TYPE_COLORS.get(self.transfer_type, "secondary")
 
 
 # ==========================================
@@ -252,6 +329,9 @@ class TransferStatus(str, enum.Enum):
     EXPIRED = "Expired"
 
 
+TRANSFER_STATUS_VALUES = tuple(s.value for s in TransferStatus)
+
+
 class BarTransfer(Base):
     __tablename__ = "bar_transfers"
 
@@ -261,12 +341,18 @@ class BarTransfer(Base):
     to_mobile = Column(String(11), nullable=False)
     otp_hash = Column(String, nullable=True)
     otp_expiry = Column(DateTime(timezone=True), nullable=True)
-    status = Column(String, default=TransferStatus.PENDING, nullable=False)
+    status = Column(SAEnum(*TRANSFER_STATUS_VALUES, name="bar_transfer_status"), default=TransferStatus.PENDING, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     bar = relationship("Bar")
     from_customer = relationship("User", foreign_keys=[from_customer_id])
 
+    # Partial: "open transfer for this bar" checks only ever look at Pending rows
+    __table_args__ = (
+        Index("ix_bar_transfers_pending", "bar_id",
+              postgresql_where=text("status = 'Pending'")),
+    )
+
 
 # ==========================================
 # Reconciliation (انبارگردانی)
@@ -284,15 +370,48 @@ class ReconciliationItemStatus(str, enum.Enum):
     UNEXPECTED = "Unexpected"  # اسکن شده ولی در سیستم این لوکیشن نیست
 
 
+RECONCILIATION_STATUS_VALUES = tuple(s.value for s in ReconciliationStatus)
+RECONCILIATION_ITEM_STATUS_VALUES = tuple(s.value for s in ReconciliationItemStatus)
+
+# Persian label / badge color per reconciliation session status
+RECONCILIATION_STATUS_LABELS = {
+    ReconciliationStatus.IN_PROGRESS: "در حال انجام",
+    ReconciliationStatus.COMPLETED: "تکمیل‌شده",
+    ReconciliationStatus.CANCELLED: "لغو‌شده",
+}
+
+RECONCILIATION_STATUS_COLORS = {
+    ReconciliationStatus.IN_PROGRESS: "warning",
+    ReconciliationStatus.COMPLETED: "success",
+    ReconciliationStatus.CANCELLED: "secondary",
+}
+
+
+# Persian label / badge color per reconciliation item status
+RECONCILIATION_ITEM_STATUS_LABELS = {
+    ReconciliationItemStatus.MATCHED: "تطابق",
+    ReconciliationItemStatus.MISSING: "مفقود",
+    ReconciliationItemStatus.UNEXPECTED: "اضافی",
+}
+
+RECONCILIATION_ITEM_STATUS_COLORS = {
+    ReconciliationItemStatus.MATCHED: "success",
+    ReconciliationItemStatus.MISSING: "danger",
+    ReconciliationItemStatus.UNEXPECTED: "warning",
+}
+
+
 class ReconciliationSession(Base):
     __tablename__ = "reconciliation_sessions"
 
     id = Column(Integer, primary_key=True)
     dealer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     initiated_by = Column(String, nullable=False)
-    status = Column(String, default=ReconciliationStatus.IN_PROGRESS, nullable=False)
+    status = Column(SAEnum(*RECONCILIATION_STATUS_VALUES, name="reconciliation_status"),
+                    default=ReconciliationStatus.IN_PROGRESS, nullable=False)
 
-    # Summary stats (computed on finalize)
+    # Summary stats — denormalized per session: incremented on scan and settled on
+    # finalize, so list/detail pages read them directly and never count items.
     total_expected = Column(Integer, default=0)
     total_scanned = Column(Integer, default=0)
     total_matched = Column(Integer, default=0)
@@ -306,31 +425,29 @@ class ReconciliationSession(Base):
     # Relationships
     dealer = relationship("User", foreign_keys=[dealer_id])
     items = relationship("ReconciliationItem", back_populates="session",
-                         cascade="all, delete-orphan",
+                         cascade="all, delete-orphan", passive_deletes=True,
                          order_by="ReconciliationItem.id.desc()")
 
     @property
     def status_label(self) -> str:
-        labels = {
-            ReconciliationStatus.IN_PROGRESS: "در حال انجام",
-            ReconciliationStatus.COMPLETED: "تکمیل‌شده",
-            ReconciliationStatus.CANCELLED: "لغو‌شده",
-        }
-        return labels.get(self.status, str(self.status))
+        return RECONCILIATION_STATUS_LABELS.get(self.status) or str(self.status)
 
     @property
     def status_color(self) -> str:
-        colors = {
-            ReconciliationStatus.IN_PROGRESS: "warning",
-            ReconciliationStatus.COMPLETED: "success",
-            ReconciliationStatus.CANCELLED: "secondary",
-        }
-        return colors.get(self.status, "secondary")
+        return RECONCILIATION_STATUS_COLORS.get(self.status, "secondary")
 
-    @property
+    @hybrid_property
     def has_mismatches(self) -> bool:
         return (self.total_missing or 0) > 0 or (self.total_unexpected or 0) > 0
 
+    @has_mismatches.expression
+    def has_mismatches(cls):
+        # SQL side, so queries can .filter(ReconciliationSession.has_mismatches)
+        return or_(
+            func.coalesce(cls.total_missing, 0) > 0,
+            func.coalesce(cls.total_unexpected, 0) > 0,
+        )
+
 
 class ReconciliationItem(Base):
     __tablename__ = "reconciliation_items"
@@ -338,34 +455,32 @@ class ReconciliationItem(Base):
     id = Column(Integer, primary_key=True)
     session_id = Column(Integer, ForeignKey("reconciliation_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     bar_id = Column(Integer, ForeignKey("bars.id", ondelete="SET NULL"), nullable=True, index=True)
-    serial_code = Column(String(12), nullable=False)
-    item_status = Column(String(20), nullable=False)
+    serial_code = Column(String(12, collation="C"), nullable=False)
+    item_status = Column(SAEnum(*RECONCILIATION_ITEM_STATUS_VALUES, name="reconciliation_item_status"), nullable=False)
     scanned_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
 
     # Snapshot of bar state at scan time
     expected_status = Column(String, nullable=True)
     expected_product = Column(String, nullable=True)
 
-    session = relationship("ReconciliationSession", back_populates="items")
+    session = relationship("ReconciliationSession", back_populates="items", lazy="selectin")
     bar = relationship("Bar")
 
+    # Serves ReconciliationSession.items (ordered by id desc) without a sort step;
+    # INCLUDE makes per-session status/bar lookups index-only scans
+    __table_args__ = (
+        Index("ix_recon_items_covering", "session_id", id.desc(),
+              postgresql_include=["bar_id", "serial_code", "item_status", "scanned_at"]),
+        UniqueConstraint("session_id", "serial_code", name="uq_recon_item_session_serial"),
+    )
+
     @property
     def item_status_label(self) -> str:
-        labels = {
-            ReconciliationItemStatus.MATCHED: "تطابق",
-            ReconciliationItemStatus.MISSING: "مفقود",
-            ReconciliationItemStatus.UNEXPECTED: "اضافی",
-        }
-        return labels.get(self.item_status, str(self.item_status))
+        return RECONCILIATION_ITEM_STATUS_LABELS.get(self.item_status) or str(self.item_status)
 
     @property
     def item_status_color(self) -> str:
-        colors = {
-            ReconciliationItemStatus.MATCHED: "success",
-            ReconciliationItemStatus.MISSING: "danger",
-            ReconciliationItemStatus.UNEXPECTED: "warning",
-        }
-        return colors.get(self.item_status, "secondary")
+        return RECONCILIATION_ITEM_STATUS_COLORS.get(self.item_status, "secondary")
 
 
 # ==========================================
@@ -379,6 +494,24 @@ class CustodialDeliveryStatus(str, enum.Enum):
     EXPIRED = "Expired"       # منقضی شده
 
 
+CUSTODIAL_DELIVERY_STATUS_VALUES = tuple(s.value for s in CustodialDeliveryStatus)
+
+# Persian label / badge color per custodial delivery status
+CUSTODIAL_DELIVERY_STATUS_LABELS = {
+    CustodialDeliveryStatus.PENDING: "در انتظار تحویل",
+    CustodialDeliveryStatus.COMPLETED: "تحویل داده شده",
+    CustodialDeliveryStatus.CANCELLED: "لغو شده",
+    CustodialDeliveryStatus.EXPIRED: "منقضی شده",
+}
+
+CUSTODIAL_DELIVERY_STATUS_COLORS = {
+    CustodialDeliveryStatus.PENDING: "warning",
+    CustodialDeliveryStatus.COMPLETED: "success",
+    CustodialDeliveryStatus.CANCELLED: "secondary",
+    CustodialDeliveryStatus.EXPIRED: "danger",
+}
+
+
 class CustodialDeliveryRequest(Base):
     __tablename__ = "custodial_delivery_requests"
 
@@ -387,7 +520,8 @@ class CustodialDeliveryRequest(Base):
     bar_id = Column(Integer, ForeignKey("bars.id", ondelete="CASCADE"), nullable=False, index=True)
     dealer_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
 
-    status = Column(String, default=CustodialDeliveryStatus.PENDING, nullable=False)
+    status = Column(SAEnum(*CUSTODIAL_DELIVERY_STATUS_VALUES, name="custodial_delivery_status"),
+                    default=CustodialDeliveryStatus.PENDING, nullable=False)
 
     # OTP for handoff verification (sent to customer mobile)
     otp_hash = Column(String, nullable=True)
@@ -403,25 +537,20 @@ class CustodialDeliveryRequest(Base):
 
     # Relationships
     customer = relationship("User", foreign_keys=[customer_id])
-    bar = relationship("Bar")
+    # Every delivery-request list shows the bar: batch-load it (one IN query per page)
+    bar = relationship("Bar", lazy="selectin")
     dealer = relationship("User", foreign_keys=[dealer_id])
 
+    # Partial: "active request for this bar" checks only ever look at Pending rows
+    __table_args__ = (
+        Index("ix_custodial_delivery_pending", "bar_id",
+              postgresql_where=text("status = 'Pending'")),
+    )
+
     @property
     def status_label(self) -> str:
-        labels = {
-            CustodialDeliveryStatus.PENDING: "در انتظار تحویل",
-            CustodialDeliveryStatus.COMPLETED: "تحویل داده شده",
-            CustodialDeliveryStatus.CANCELLED: "لغو شده",
-            CustodialDeliveryStatus.EXPIRED: "منقضی شده",
-        }
-        return labels.get(self.status, str(self.status))
+        return CUSTODIAL_DELIVERY_STATUS_LABELS.get(self.status) or str(self.status)
 
     @property
     def status_color(self) -> str:
-        colors = {
-            CustodialDeliveryStatus.PENDING: "warning",
-            CustodialDeliveryStatus.COMPLETED: "success",
-            CustodialDeliveryStatus.CANCELLED: "secondary",
-            CustodialDeliveryStatus.EXPIRED: "danger",
-        }
-        return colors.get(self.status, "secondary")
+        return CUSTODIAL_DELIVERY_STATUS_COLORS.get(self.status, "secondary")
@@ -5,27 +5,76 @@ Bar generation, CRUD, bulk operations, and reservation management.
 """
 
 import math
-import secrets
+import os
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import List, Optional, Tuple
 
 from fastapi import UploadFile
-from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import String, bindparam, case, cast, func, insert, literal, null, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, joinedload, selectinload, raiseload
 
 from common.helpers import safe_int, now_utc
 from common.upload import save_upload_file, delete_file
 from modules.inventory.models import (
-    Bar, BarImage, BarBatchLink, BarStatus, OwnershipHistory, DealerTransfer, TransferType,
+    Bar, BarImage, BarBatchLink, BarStatus, BAR_STATUS_VALUES, OwnershipHistory, DealerTransfer, TransferType,
     ReconciliationSession, ReconciliationItem, ReconciliationStatus, ReconciliationItemStatus,
+    enum_eq,
 )
 
 # Characters for serial codes (no ambiguous: 0, O, I, 1)
 SAFE_CHARS = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
 
+# Parallel image saves per update_bar call
+IMAGE_SAVE_WORKERS = 4
+
+# 32 symbols repeated 8 times = one entry per byte value, so mapping raw
+# urandom bytes through this table is uniform without any rejection step
+_SERIAL_BYTE_TABLE = (SAFE_CHARS * (256 // len(SAFE_CHARS))).encode("ascii")
+
+# Bar statuses counted as "on the shelf" by stock reconciliation
+RECON_STATUSES = (BarStatus.ASSIGNED, BarStatus.RESERVED)
+
+# Reservation release statements, built once per process and re-executed with
+# bound parameters (expanding IN keeps one cache entry for any list length)
+_RELEASE_VALUES = {
+    Bar.status: BarStatus.ASSIGNED,
+    Bar.reserved_customer_id: None,
+    Bar.reserved_until: None,
+}
+_RELEASE_IDS_STMT = (
+    update(Bar)
+    .where(Bar.id.in_(bindparam("ids", expanding=True)))
+    .values(_RELEASE_VALUES)
+    .execution_options(synchronize_session=False)
+)
+# Predicate matches ix_bars_reserved_active (reserved_until WHERE status =
+# 'Reserved'); "< now" already excludes NULL, so no IS NOT NULL clause.
+_RELEASE_EXPIRED_STMT = (
+    update(Bar)
+    .where(Bar.status == BarStatus.RESERVED, Bar.reserved_until < bindparam("now", type_=Bar.reserved_until.type))
+    .values(_RELEASE_VALUES)
+    .execution_options(synchronize_session=False)
+)
+
 
 def generate_serial(length: int = 8) -> str:
     """Generate a random serial code using safe characters."""
-    return "".join(secrets.choice(SAFE_CHARS) for _ in range(length))
+    return os.urandom(length).translate(_SERIAL_BYTE_TABLE).decode("ascii")
+
+
+def generate_serials(n: int, length: int = 8) -> List[str]:
+    """Generate N serial codes from a single urandom draw."""
+    raw = os.urandom(n * length).translate(_SERIAL_BYTE_TABLE).decode("ascii")
+    return [raw[i:i + length] for i in range(0, n * length, length)]
+
+
+def _parse_fk(data: dict, key: str) -> Optional[int]:
+    """Form FK value → id, or None for missing / "" / "0" (the "none" option)."""
+    value = data.get(key)
+    return None if value in (None, "", "0") else safe_int(value)
 
 
 class InventoryService:
@@ -46,99 +95,146 @@ class InventoryService:
         dealer_id: int = None,
         dealer_tier_id: int = None,
         is_sellable: bool = None,
-    ) -> Tuple[List[Bar], int, int]:
+        after_id: int = None,
+    ) -> Tuple[List[Bar], int, int, Optional[int]]:
         """
         List bars with pagination, search, and filters.
-        Returns: (bars, total_count, total_pages)
-        """
-        query = db.query(Bar).options(
-            joinedload(Bar.product),
-            joinedload(Bar.customer),
-            selectinload(Bar.batch_links).joinedload(BarBatchLink.batch),
-            joinedload(Bar.dealer_location),
-        ).order_by(Bar.id.desc())
 
+        after_id (keyset cursor = last id of the previous page) replaces OFFSET
+        for "next page" links, so deep pages cost the same as page 1.
+        Returns: (bars, total_count, total_pages, next_cursor)
+        """
+        conditions = []
         if search:
-            query = query.filter(Bar.serial_code.ilike(f"%{search}%"))
+            # Serials are stored upper-case, so a case-sensitive LIKE on the
+            # upper-cased term is equivalent to ILIKE and cheaper to recheck
+            # against ix_bars_serial_trgm
+            conditions.append(Bar.serial_code.like(f"%{search.strip().upper()}%"))
         if customer_id:
-            query = query.filter(Bar.customer_id == customer_id)
+            conditions.append(Bar.customer_id == customer_id)
         if status:
-            query = query.filter(Bar.status == status)
+            conditions.append(enum_eq(Bar.status, status, BAR_STATUS_VALUES))
         if product_id:
-            query = query.filter(Bar.product_id == product_id)
+            conditions.append(Bar.product_id == product_id)
         if dealer_id:
-            query = query.filter(Bar.dealer_id == dealer_id)
+            conditions.append(Bar.dealer_id == dealer_id)
         if dealer_tier_id:
             # Bars whose physical location is a dealer of this tier
             from modules.user.models import User
-            query = query.filter(Bar.dealer_id.in_(
-                db.query(User.id).filter(User.tier_id == dealer_tier_id)
+            conditions.append(Bar.dealer_id.in_(
+                select(User.id).where(User.tier_id == dealer_tier_id)
             ))
         if is_sellable is not None:
-            query = query.filter(Bar.is_sellable == is_sellable)
-
-        total = query.count()
+            conditions.append(Bar.is_sellable == is_sellable)
+
+        # Everything the list template touches is loaded up front; any other
+        # relationship access raises instead of silently issuing one SELECT per row.
+        # All side-loads are IN queries keyed on the page's ids: the window count
+        # sees every matching row, so joins here would run over the full match
+        # set rather than just the LIMITed page.
+        # Total rides along on every page row (one scan instead of count + page);
+        # only a page past the end needs a separate COUNT.
+        paged = (
+            select(Bar, func.count().over().label("_total"))
+            .where(*conditions)
+            .options(
+                selectinload(Bar.product),
+                selectinload(Bar.customer),
+                selectinload(Bar.batch_links).joinedload(BarBatchLink.batch),
+                selectinload(Bar.dealer_location),
+                raiseload("*"),
+            )
+            .order_by(Bar.id.desc())
+            .limit(per_page)
+        )
+        skipped = (page - 1) * per_page
+        if after_id:
+            # Keyset: the window count covers only rows after the cursor, i.e.
+            # everything from this page on — the earlier pages are `skipped`.
+            rows = db.execute(paged.where(Bar.id < after_id)).all()
+            total = skipped + rows[0]._total if rows else None
+        else:
+            rows = db.execute(paged.offset(skipped)).all()
+            total = rows[0]._total if rows else None
+        if total is None:
+            total = (
+                db.scalar(select(func.count()).select_from(Bar).where(*conditions))
+                if page > 1 else 0
+            )
+        bars = [row[0] for row in rows]
         total_pages = math.ceil(total / per_page) if total else 1
-        bars = query.offset((page - 1) * per_page).limit(per_page).all()
+        next_cursor = bars[-1].id if bars and page < total_pages else None
 
-        return bars, total, total_pages
+        return bars, total, total_pages, next_cursor
 
     def get_by_id(self, db: Session, bar_id: int) -> Optional[Bar]:
-        return db.query(Bar).filter(Bar.id == bar_id).first()
+        return db.get(Bar, bar_id)
 
     def get_by_serial(self, db: Session, serial: str) -> Optional[Bar]:
-        return db.query(Bar).filter(Bar.serial_code == serial).first()
+        """Scanner lookup: product/dealer/customer joined in the same query."""
+        return db.scalars(
+            select(Bar)
+            .options(
+                joinedload(Bar.product),
+                joinedload(Bar.dealer_location),
+                joinedload(Bar.customer),
+            )
+            .where(Bar.serial_code == serial)
+            .limit(1)
+        ).first()
 
     # ==========================================
     # Generate
     # ==========================================
 
+    def _insert_bars(self, db: Session, count: int, **fields) -> List[int]:
+        """
+        Bulk-insert `count` bars with fresh serials; returns the new ids.
+
+        One multi-row INSERT per round; serial collisions are skipped by
+        ON CONFLICT and only the shortfall is regenerated in the next round.
+        """
+        ids: List[int] = []
+        for attempt in range(5):
+            remaining = count - len(ids)
+            if remaining <= 0:
+                break
+            rows = [{"serial_code": serial, **fields} for serial in generate_serials(remaining)]
+            ids += db.execute(
+                pg_insert(Bar)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["serial_code"])
+                .returning(Bar.id)
+            ).scalars().all()
+        return ids
+
     def generate_bars(self, db: Session, count: int) -> int:
         """Generate N new raw bars with unique serial codes. Returns count created."""
-        created = 0
-        for _ in range(count):
-            for attempt in range(5):
-                try:
-                    bar = Bar(serial_code=generate_serial(), status=BarStatus.RAW)
-                    db.add(bar)
-                    db.commit()
-                    created += 1
-                    break
-                except IntegrityError:
-                    db.rollback()
-                    if attempt == 4:
-                        raise
+        created = len(self._insert_bars(db, count, status=BarStatus.RAW))
+        db.commit()
         return created
 
     def generate_preorder_bars(self, db: Session, product_id: int, central_warehouse_id: int, count: int) -> int:
         """Generate N preorder bars: ASSIGNED to central warehouse with is_preorder=True."""
-        created = 0
-        for _ in range(count):
-            for attempt in range(5):
-                try:
-                    bar = Bar(
-                        serial_code=generate_serial(),
-                        status=BarStatus.ASSIGNED,
-                        product_id=product_id,
-                        dealer_id=central_warehouse_id,
-                        is_preorder=True,
-                    )
-                    db.add(bar)
-                    db.flush()
-                    db.add(OwnershipHistory(
-                        bar_id=bar.id,
-                        previous_owner_id=None,
-                        new_owner_id=None,
-                        description=f"تولید پیش‌سفارش — انبار مرکزی",
-                    ))
-                    db.commit()
-                    created += 1
-                    break
-                except IntegrityError:
-                    db.rollback()
-                    if attempt == 4:
-                        raise
-        return created
+        ids = self._insert_bars(
+            db, count,
+            status=BarStatus.ASSIGNED,
+            product_id=product_id,
+            dealer_id=central_warehouse_id,
+            is_preorder=True,
+        )
+        if ids:
+            db.execute(insert(OwnershipHistory), [
+                {
+                    "bar_id": bar_id,
+                    "previous_owner_id": None,
+                    "new_owner_id": None,
+                    "description": "تولید پیش‌سفارش — انبار مرکزی",
+                }
+                for bar_id in ids
+            ])
+        db.commit()
+        return len(ids)
 
     # ==========================================
     # Update
@@ -157,8 +253,8 @@ class InventoryService:
         if not bar:
             return None
 
-        new_cust = safe_int(data.get("customer_id")) if data.get("customer_id") != "0" else None
-        new_prod = safe_int(data.get("product_id")) if data.get("product_id") != "0" else None
+        new_cust = _parse_fk(data, "customer_id")
+        new_prod = _parse_fk(data, "product_id")
 
         # Track ownership change
         if bar.customer_id != new_cust:
@@ -171,7 +267,9 @@ class InventoryService:
 
         # Update fields
         new_status = data.get("status", bar.status)
-        new_dealer = safe_int(data.get("dealer_id")) if data.get("dealer_id") != "0" else None
+        if new_status not in BAR_STATUS_VALUES:
+            raise ValueError("وضعیت شمش نامعتبر است.")
+        new_dealer = _parse_fk(data, "dealer_id")
 
         # Validation: bar with product must have a dealer (physical location)
         if new_prod and not new_dealer:
@@ -209,9 +307,13 @@ class InventoryService:
                 try:
                     from modules.rasis.service import rasis_service
                     from modules.user.models import User
-                    dealer_obj = db.query(User).get(new_dealer)
-                    if dealer_obj and dealer_obj.rasis_sharepoint:
-                        rasis_service.add_bar_to_pos(db, bar, dealer_obj)
+                    # Most dealers have no POS device: probe the one column first
+                    # and only load the full dealer row when it's actually needed
+                    has_sharepoint = db.query(User.rasis_sharepoint).filter(
+                        User.id == new_dealer,
+                    ).scalar()
+                    if has_sharepoint:
+                        rasis_service.add_bar_to_pos(db, bar, db.get(User, new_dealer))
                 except Exception:
                     pass  # Never block admin operations
 
@@ -224,14 +326,21 @@ class InventoryService:
             bar.reserved_customer_id = None
             bar.reserved_until = None
 
-        # Save new images
+        # Save new images — one bulk INSERT for all rows, no ORM object per image
         if files:
-            for f in files:
-                if not f or not f.filename:
-                    continue
-                path = save_upload_file(f, subfolder="bars")
-                if path:
-                    db.add(BarImage(file_path=path, bar_id=bar.id))
+            uploads = [f for f in files if f and f.filename]
+            if len(uploads) > 1:
+                # Decode/resize/write is I/O + Pillow (GIL released): save in
+                # parallel so N photos take about as long as the slowest one
+                with ThreadPoolExecutor(max_workers=min(len(uploads), IMAGE_SAVE_WORKERS)) as pool:
+                    saved = list(pool.map(partial(save_upload_file, subfolder="bars"), uploads))
+            else:
+                saved = [save_upload_file(f, subfolder="bars") for f in uploads]
+            paths = [path for path in saved if path]
+            if paths:
+                db.execute(insert(BarImage), [{"file_path": p, "bar_id": bar.id} for p in paths])
+                if not bar.primary_image_path:
+                    bar.primary_image_path = paths[0]
 
         db.flush()
         return bar
@@ -301,7 +410,7 @@ class InventoryService:
 
         # Resolve target values first
         has_dealer = data.get("target_dealer_id") not in (None, "")
-        target_dealer = safe_int(data["target_dealer_id"]) if has_dealer and data["target_dealer_id"] != "0" else None
+        target_dealer = _parse_fk(data, "target_dealer_id")
 
         # Explicit status wins over the status implied by product/customer below
         explicit_status = (data.get("target_status") or "").strip() or None
@@ -317,7 +426,7 @@ class InventoryService:
         has_product = data.get("target_product_id") not in (None, "")
         prod_id = None
         if has_product:
-            prod_id = safe_int(data["target_product_id"]) if data["target_product_id"] != "0" else None
+            prod_id = _parse_fk(data, "target_product_id")
             # Validation: bar with product must have dealer (physical location)
             if prod_id and not target_dealer:
                 orphan_count = db.query(Bar).filter(Bar.id.in_(ids), Bar.dealer_id.is_(None)).count()
@@ -325,13 +434,21 @@ class InventoryService:
                     raise ValueError("شمش دارای محصول باید مکان (نماینده) داشته باشد.")
             update_data[Bar.product_id] = prod_id
             if not explicit_status:
-                update_data[Bar.status] = BarStatus.ASSIGNED if prod_id else BarStatus.RAW
+                if prod_id:
+                    # Re-pointing the product must not un-sell a sold bar (it keeps
+                    # its owner); everything else becomes Assigned in the same UPDATE
+                    update_data[Bar.status] = case(
+                        (Bar.status == BarStatus.SOLD, Bar.status),
+                        else_=BarStatus.ASSIGNED,
+                    )
+                else:
+                    update_data[Bar.status] = BarStatus.RAW
 
         # Customer assignment
         has_customer = data.get("target_customer_id") not in (None, "")
         cust_id = None
         if has_customer:
-            cust_id = safe_int(data["target_customer_id"]) if data["target_customer_id"] != "0" else None
+            cust_id = _parse_fk(data, "target_customer_id")
             if not target_dealer:
                 orphan_count = db.query(Bar).filter(Bar.id.in_(ids), Bar.dealer_id.is_(None)).count()
                 if orphan_count > 0 and not has_dealer:
@@ -363,10 +480,21 @@ class InventoryService:
 
         count = 0
         if update_data:
+            # Skip rows already in the target state: Postgres writes a new tuple
+            # (heap + every index, WAL) for each matched row even when no value
+            # changes, so re-applying the same values to a large selection is
+            # pure write amplification.
+            changed = or_(
+                *(col.is_distinct_from(val) for col, val in update_data.items()),
+                Bar.reserved_customer_id.isnot(None),
+                Bar.reserved_until.isnot(None),
+            )
             # Always clear reservation on bulk update
             update_data[Bar.reserved_customer_id] = None
             update_data[Bar.reserved_until] = None
-            count = db.query(Bar).filter(Bar.id.in_(ids)).update(update_data, synchronize_session=False)
+            count = db.query(Bar).filter(Bar.id.in_(ids), changed).update(
+                update_data, synchronize_session=False,
+            )
             db.flush()
 
         if batch_change:
@@ -445,7 +573,7 @@ class InventoryService:
                 if not bar.dealer_id or bar.status != BarStatus.ASSIGNED or not bar.product_id:
                     continue
                 if bar.dealer_id not in dealer_cache:
-                    dealer_cache[bar.dealer_id] = db.query(User).get(bar.dealer_id)
+                    dealer_cache[bar.dealer_id] = db.get(User, bar.dealer_id)
                 dealer_obj = dealer_cache[bar.dealer_id]
                 if not dealer_obj or not dealer_obj.rasis_sharepoint:
                     continue
@@ -466,14 +594,18 @@ class InventoryService:
         if not ids:
             return 0
 
-        bars = db.query(Bar).filter(Bar.id.in_(ids), Bar.is_sellable != sellable).all()
+        # One UPDATE ... RETURNING: flips only rows that actually change and hands
+        # back those bars for the Rasis sync (no prior SELECT, no per-row UPDATE)
+        bars = db.execute(
+            update(Bar)
+            .where(Bar.id.in_(ids), Bar.is_sellable != sellable)
+            .values(is_sellable=sellable)
+            .returning(Bar)
+            .execution_options(synchronize_session="fetch")
+        ).scalars().all()
         if not bars:
             return 0
 
-        for bar in bars:
-            bar.is_sellable = sellable
-        db.flush()
-
         self._sync_sellable_to_rasis(db, bars, sellable)
         return len(bars)
 
@@ -489,13 +621,25 @@ class InventoryService:
 
     def delete_image(self, db: Session, img_id: int) -> Optional[int]:
         """Delete a bar image. Returns bar_id or None."""
-        img = db.query(BarImage).filter(BarImage.id == img_id).first()
+        img = db.get(BarImage, img_id)
         if not img:
             return None
         delete_file(img.file_path)
         bar_id = img.bar_id
         db.delete(img)
         db.flush()
+
+        # Keep the denormalized primary image pointing at the first remaining image
+        bar = db.get(Bar, bar_id)
+        if bar and bar.primary_image_path == img.file_path:
+            bar.primary_image_path = (
+                db.query(BarImage.file_path)
+                .filter(BarImage.bar_id == bar_id)
+                .order_by(BarImage.id)
+                .limit(1)
+                .scalar()
+            )
+            db.flush()
         return bar_id
 
     # ==========================================
@@ -509,16 +653,19 @@ class InventoryService:
         customer_id: int,
         quantity: int,
         expire_minutes: int = 15,
+        now: Optional[datetime] = None,
     ) -> List[Bar]:
         """
         Reserve N available bars for a customer.
-        Uses SELECT FOR UPDATE to prevent race conditions.
+        Uses FOR UPDATE SKIP LOCKED + UPDATE ... RETURNING to prevent race conditions.
         """
-        from datetime import timedelta
+        expire_at = (now or now_utc()) + timedelta(minutes=expire_minutes)
 
-        available = (
-            db.query(Bar)
-            .filter(
+        # One statement: lock up to N free bars (SKIP LOCKED), and reserve them
+        # only if all N were found — otherwise nothing is updated.
+        picked = (
+            select(Bar.id)
+            .where(
                 Bar.product_id == product_id,
                 Bar.status == BarStatus.ASSIGNED,
                 Bar.customer_id.is_(None),
@@ -526,44 +673,33 @@ class InventoryService:
             )
             .with_for_update(skip_locked=True)
             .limit(quantity)
-            .all()
+            .cte("picked")
         )
-
-        if len(available) < quantity:
-            return []
-
-        now = now_utc()
-        expire_at = now + timedelta(minutes=expire_minutes)
-
-        for bar in available:
-            bar.status = BarStatus.RESERVED
-            bar.reserved_customer_id = customer_id
-            bar.reserved_until = expire_at
-
-        db.flush()
-        return available
+        stmt = (
+            update(Bar)
+            .where(
+                Bar.id.in_(select(picked.c.id)),
+                select(func.count()).select_from(picked).scalar_subquery() == quantity,
+            )
+            .values(
+                status=BarStatus.RESERVED,
+                reserved_customer_id=customer_id,
+                reserved_until=expire_at,
+            )
+            .returning(Bar)
+            .execution_options(synchronize_session="fetch")
+        )
+        return db.execute(stmt).scalars().all()
 
     def release_bars(self, db: Session, bar_ids: List[int]):
         """Release reserved bars back to Assigned status."""
-        db.query(Bar).filter(Bar.id.in_(bar_ids)).update({
-            Bar.status: BarStatus.ASSIGNED,
-            Bar.reserved_customer_id: None,
-            Bar.reserved_until: None,
-        }, synchronize_session=False)
+        db.execute(_RELEASE_IDS_STMT, {"ids": list(bar_ids)})
         db.flush()
 
-    def release_expired_reservations(self, db: Session) -> int:
+    def release_expired_reservations(self, db: Session, now: Optional[datetime] = None) -> int:
         """Release all bars whose reservation has expired. Returns count released."""
-        now = now_utc()
-        count = db.query(Bar).filter(
-            Bar.status == BarStatus.RESERVED,
-            Bar.reserved_until.isnot(None),
-            Bar.reserved_until < now,
-        ).update({
-            Bar.status: BarStatus.ASSIGNED,
-            Bar.reserved_customer_id: None,
-            Bar.reserved_until: None,
-        }, synchronize_session=False)
+        now = now or now_utc()
+        count = db.execute(_RELEASE_EXPIRED_STMT, {"now": now}).rowcount
         db.flush()
         return count
 
@@ -573,10 +709,13 @@ class InventoryService:
 
     def get_bar_count_by_dealer(self, db: Session) -> dict:
         """Returns {dealer_id: count} for inventory dashboard."""
-        from sqlalchemy import func
-        rows = db.query(Bar.dealer_id, func.count(Bar.id)).filter(
-            Bar.dealer_id.isnot(None),
-        ).group_by(Bar.dealer_id).all()
+        # count(*) rather than count(id): the partial dealer_id index alone
+        # answers it (index-only scan, no heap visit for the PK)
+        rows = db.execute(
+            select(Bar.dealer_id, func.count())
+            .where(Bar.dealer_id.isnot(None))
+            .group_by(Bar.dealer_id)
+        ).all()
         return {dealer_id: cnt for dealer_id, cnt in rows}
 
     def transfer_bar_to_dealer(
@@ -591,7 +730,7 @@ class InventoryService:
         reference_id: int = None,
     ) -> Optional[Bar]:
         """Move a bar to a new dealer/warehouse with history tracking."""
-        bar = db.query(Bar).filter(Bar.id == bar_id).first()
+        bar = db.get(Bar, bar_id)
         if not bar:
             return None
 
@@ -620,7 +759,10 @@ class InventoryService:
         return bar
 
     def get_transfers_for_bar(self, db: Session, bar_id: int) -> List[DealerTransfer]:
-        return db.query(DealerTransfer).filter(
+        return db.query(DealerTransfer).options(
+            joinedload(DealerTransfer.from_dealer),
+            joinedload(DealerTransfer.to_dealer),
+        ).filter(
             DealerTransfer.bar_id == bar_id,
         ).order_by(DealerTransfer.transferred_at.desc()).all()
 
@@ -639,7 +781,7 @@ class InventoryService:
 
         expected = db.query(Bar).filter(
             Bar.dealer_id == dealer_id,
-            Bar.status.in_([BarStatus.ASSIGNED, BarStatus.RESERVED]),
+            Bar.status.in_(RECON_STATUSES),
             Bar.is_preorder == False,  # Preorder bars don't physically exist
         ).count()
 
@@ -657,63 +799,69 @@ class InventoryService:
         self, db: Session, session_id: int, serial_code: str, dealer_id: int,
     ) -> dict:
         """Record a scanned bar in a reconciliation session. Returns result dict."""
-        session = db.query(ReconciliationSession).filter(
+        active = db.query(ReconciliationSession.id).filter(
             ReconciliationSession.id == session_id,
             ReconciliationSession.dealer_id == dealer_id,
             ReconciliationSession.status == ReconciliationStatus.IN_PROGRESS,
         ).first()
-        if not session:
+        if not active:
             return {"error": "جلسه انبارگردانی فعال یافت نشد"}
 
         serial_code = serial_code.strip().upper()
 
-        # Check for duplicate scan
-        existing = db.query(ReconciliationItem).filter(
-            ReconciliationItem.session_id == session_id,
-            ReconciliationItem.serial_code == serial_code,
-        ).first()
-        if existing:
-            return {"error": "این سریال قبلاً اسکن شده", "duplicate": True}
-
-        bar = db.query(Bar).filter(Bar.serial_code == serial_code).first()
-
-        if bar and bar.dealer_id == dealer_id:
-            # Matched — bar is at this location
-            item = ReconciliationItem(
-                session_id=session_id,
-                bar_id=bar.id,
-                serial_code=serial_code,
-                item_status=ReconciliationItemStatus.MATCHED,
-                expected_status=bar.status,
-                expected_product=bar.product.name if bar.product else None,
-            )
-            status = "matched"
-        else:
-            # Unexpected — bar not at this location (or doesn't exist)
-            item = ReconciliationItem(
+        # Product name is snapshotted on the item: fetch it in the same query
+        bar = (
+            db.query(Bar)
+            .options(joinedload(Bar.product))
+            .filter(Bar.serial_code == serial_code)
+            .first()
+        )
+        # Matched — bar is at this location; otherwise unexpected (elsewhere or unknown)
+        status = "matched" if bar and bar.dealer_id == dealer_id else "unexpected"
+        expected_status = bar.status if bar else None
+        expected_product = bar.product.name if bar and bar.product else None
+
+        # Single INSERT; a repeated serial in the same session hits
+        # uq_recon_item_session_serial and inserts nothing (safe under concurrent scans)
+        item_id = db.execute(
+            pg_insert(ReconciliationItem)
+            .values(
                 session_id=session_id,
                 bar_id=bar.id if bar else None,
                 serial_code=serial_code,
-                item_status=ReconciliationItemStatus.UNEXPECTED,
-                expected_status=bar.status if bar else None,
-                expected_product=bar.product.name if bar and bar.product else None,
+                item_status=(ReconciliationItemStatus.MATCHED if status == "matched"
+                             else ReconciliationItemStatus.UNEXPECTED),
+                expected_status=expected_status,
+                expected_product=expected_product,
             )
-            status = "unexpected"
-
-        db.add(item)
-        session.total_scanned = (session.total_scanned or 0) + 1
-        if status == "matched":
-            session.total_matched = (session.total_matched or 0) + 1
-        elif status == "unexpected":
-            session.total_unexpected = (session.total_unexpected or 0) + 1
-        db.flush()
+            .on_conflict_do_nothing(index_elements=["session_id", "serial_code"])
+            .returning(ReconciliationItem.id)
+        ).scalar()
+        if item_id is None:
+            return {"error": "این سریال قبلاً اسکن شده", "duplicate": True}
+
+        # Atomic in-SQL increments: concurrent scanners on the same session
+        # can't lose each other's counts (no read-modify-write in Python)
+        counter = (
+            ReconciliationSession.total_matched if status == "matched"
+            else ReconciliationSession.total_unexpected
+        )
+        db.execute(
+            update(ReconciliationSession)
+            .where(ReconciliationSession.id == session_id)
+            .values({
+                ReconciliationSession.total_scanned:
+                    func.coalesce(ReconciliationSession.total_scanned, 0) + 1,
+                counter: func.coalesce(counter, 0) + 1,
+            })
+        )
 
         return {
             "status": status,
             "serial": serial_code,
-            "product": item.expected_product or "—",
-            "bar_status": item.expected_status or "—",
-            "item_id": item.id,
+            "product": expected_product or "—",
+            "bar_status": expected_status or "—",
+            "item_id": item_id,
         }
 
     def finalize_reconciliation(
@@ -728,36 +876,53 @@ class InventoryService:
         if not session:
             raise ValueError("جلسه انبارگردانی فعال یافت نشد")
 
-        # Find bars that should be at this dealer but weren't scanned
-        scanned_bar_ids = {
-            item.bar_id for item in session.items if item.bar_id
-        }
-        expected_bars = db.query(Bar).filter(
-            Bar.dealer_id == dealer_id,
-            Bar.status.in_([BarStatus.ASSIGNED, BarStatus.RESERVED]),
-            Bar.is_preorder == False,  # Preorder bars don't physically exist
-        ).all()
-
-        for bar in expected_bars:
-            if bar.id not in scanned_bar_ids:
-                db.add(ReconciliationItem(
-                    session_id=session_id,
-                    bar_id=bar.id,
-                    serial_code=bar.serial_code,
-                    item_status=ReconciliationItemStatus.MISSING,
-                    scanned_at=None,
-                    expected_status=bar.status,
-                    expected_product=bar.product.name if bar.product else None,
-                ))
-
-        # Compute summary stats
-        matched = sum(1 for i in session.items if i.item_status == ReconciliationItemStatus.MATCHED)
-        unexpected = sum(1 for i in session.items if i.item_status == ReconciliationItemStatus.UNEXPECTED)
-        missing = len(expected_bars) - len(scanned_bar_ids & {b.id for b in expected_bars})
-
-        session.total_matched = matched
-        session.total_unexpected = unexpected
-        session.total_missing = missing
+        # Missing = bars that should be at this dealer but weren't scanned.
+        # The set difference runs in Postgres as one INSERT ... SELECT with an
+        # anti-join (NOT EXISTS on the session's items) — no bar or item rows
+        # travel to Python.
+        from modules.catalog.models import Product
+        scanned = select(ReconciliationItem.id).where(
+            ReconciliationItem.session_id == session_id,
+            ReconciliationItem.bar_id == Bar.id,
+        )
+        missing_select = (
+            select(
+                literal(session_id),
+                Bar.id,
+                Bar.serial_code,
+                cast(literal(ReconciliationItemStatus.MISSING.value), ReconciliationItem.item_status.type),
+                null(),
+                cast(Bar.status, String),
+                Product.name,
+            )
+            .select_from(Bar)
+            .outerjoin(Product, Product.id == Bar.product_id)
+            .where(
+                Bar.dealer_id == dealer_id,
+                Bar.status.in_(RECON_STATUSES),
+                Bar.is_preorder == False,  # Preorder bars don't physically exist
+                ~scanned.exists(),
+            )
+        )
+        missing_count = db.execute(
+            insert(ReconciliationItem).from_select(
+                ["session_id", "bar_id", "serial_code", "item_status",
+                 "scanned_at", "expected_status", "expected_product"],
+                missing_select,
+            )
+        ).rowcount
+
+        # Compute summary stats — one GROUP BY (a row per status) instead of
+        # loading session.items; missing is exactly the rows just generated
+        counts = dict(db.execute(
+            select(ReconciliationItem.item_status, func.count())
+            .where(ReconciliationItem.session_id == session_id)
+            .group_by(ReconciliationItem.item_status)
+        ).all())
+
+        session.total_matched = counts.get(ReconciliationItemStatus.MATCHED, 0)
+        session.total_unexpected = counts.get(ReconciliationItemStatus.UNEXPECTED, 0)
+        session.total_missing = missing_count
         session.notes = notes
         session.status = ReconciliationStatus.COMPLETED
         session.completed_at = now_utc()
@@ -6,11 +6,12 @@ Admin can send broadcast notifications to users/groups.
 
 from fastapi import APIRouter, Request, Depends, Form, BackgroundTasks
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from config.database import get_db
 from common.templating import templates
-from common.security import csrf_check, new_csrf_token
+from common.security import csrf_check, new_csrf_token, set_csrf_cookie
 from modules.auth.deps import require_permission
 from modules.notification.service import notification_service
 from modules.notification.models import NotificationType
@@ -41,7 +42,7 @@ async def admin_send_notification_form(
         "msg": msg,
         "count": count,
     })
-    response.set_cookie("csrf_token", csrf, httponly=True, samesite="lax")
+    set_csrf_cookie(response, request, csrf)
     return response
 
 
@@ -64,30 +65,34 @@ async def admin_send_notification(
     csrf_check(request, csrf_token)
     from modules.user.models import User
 
+    # Only id + mobile are needed; broadcasts are streamed (server-side cursor)
+    # so send_bulk() sees them chunk by chunk instead of one big list
+    chunk = notification_service.BULK_CHUNK_SIZE
     targets = []
     if target_type == "user" and target_mobile:
-        u = db.query(User).filter(User.mobile == target_mobile.strip()).first()
-        if u:
-            targets = [u]
+        targets = db.execute(
+            select(User.id, User.mobile).where(User.mobile == target_mobile.strip()).limit(1)
+        ).all()
     elif target_type == "all_customers":
-        targets = db.query(User).filter(User.is_active == True).all()
+        targets = db.execute(
+            select(User.id, User.mobile).where(User.is_active == True)
+            .execution_options(yield_per=chunk)
+        )
     elif target_type == "all_dealers":
-        targets = db.query(User).filter(User.is_dealer == True, User.is_active == True).all()
-
-    sms_text = body if send_sms else None
-    count = 0
-    for t in targets:
-        notification_service.send(
-            db, t.id,
-            notification_type=NotificationType.SYSTEM,
-            title=title,
-            body=body,
-            sms_text=sms_text,
-            sms_mobile=t.mobile,
-            reference_type="admin_broadcast",
-            background_tasks=background_tasks,
+        targets = db.execute(
+            select(User.id, User.mobile).where(User.is_dealer == True, User.is_active == True)
+            .execution_options(yield_per=chunk)
         )
-        count += 1
+
+    count = notification_service.send_bulk(
+        db, targets,
+        notification_type=NotificationType.SYSTEM,
+        title=title,
+        body=body,
+        sms_text=body if send_sms else None,
+        reference_type="admin_broadcast",
+        background_tasks=background_tasks,
+    )
 
     db.commit()
     return RedirectResponse(f"/admin/notifications/send?msg=sent&count={count}", status_code=302)
@@ -5,10 +5,11 @@ In-app notification center + user preferences.
 """
 
 import enum
+from types import MappingProxyType
 
 from sqlalchemy import (
     Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index,
-    UniqueConstraint,
+    UniqueConstraint, text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -39,6 +40,10 @@ class NotificationType(str, enum.Enum):
     SYSTEM = "SYSTEM"
 
 
+# All type values in declaration order (settings form/query loops)
+NOTIFICATION_TYPE_VALUES = tuple(t.value for t in NotificationType)
+
+
 class NotificationChannel(str, enum.Enum):
     SMS = "SMS"
     IN_APP = "IN_APP"
@@ -95,6 +100,26 @@ NOTIFICATION_TYPE_COLORS = {
     NotificationType.SYSTEM: "secondary",
 }
 
+# Same maps keyed by the raw column value (read-only), for the per-row
+# properties below and for templates that look up by stored string
+NOTIFICATION_TYPE_LABELS_BY_VALUE = MappingProxyType({k.value: v for k, v in NOTIFICATION_TYPE_LABELS.items()})
+NOTIFICATION_TYPE_ICONS_BY_VALUE = MappingProxyType({k.value: v for k, v in NOTIFICATION_TYPE_ICONS.items()})
+NOTIFICATION_TYPE_COLORS_BY_VALUE = MappingProxyType({k.value: v for k, v in NOTIFICATION_TYPE_COLORS.items()})
+
+
+# One-shot events: a retried handler must not notify (or SMS) twice, so at most
+# one row per (user, type, reference). Repeating references (ticket replies,
+# status changes, revisions) are deliberately absent.
+NOTIFICATION_DEDUP_REFERENCE_TYPES = (
+    "order_paid", "order_cancel",
+    "transfer_sent", "transfer_received",
+    "dealer_request_approved", "dealer_request_rejected",
+)
+NOTIFICATION_DEDUP_WHERE = text(
+    "reference_id IS NOT NULL AND reference_type IN ("
+    + ", ".join(f"'{t}'" for t in NOTIFICATION_DEDUP_REFERENCE_TYPES) + ")"
+)
+
 
 # ---------------------------------------------------------------------------
 # Models
@@ -119,31 +144,28 @@ class Notification(Base):
     user = relationship("User", foreign_keys=[user_id])
 
     __table_args__ = (
-        Index("ix_notification_user_unread", "user_id", "is_read"),
+        # Partial: unread rows only (read ones are the vast majority) — badge count
+        Index("ix_notification_user_unread_partial", "user_id",
+              postgresql_where=text("is_read = false")),
         Index("ix_notification_user_created", "user_id", "created_at"),
-        Index("ix_notification_ref", "reference_type", "reference_id"),
+        # Selective column first; broadcast rows carry no reference_id and are skipped
+        Index("ix_notification_ref", "reference_id", "reference_type",
+              postgresql_where=text("reference_id IS NOT NULL")),
+        Index("uq_notification_dedup", "user_id", "notification_type", "reference_type", "reference_id",
+              unique=True, postgresql_where=NOTIFICATION_DEDUP_WHERE),
     )
 
     @property
     def type_label(self) -> str:
-        try:
-            return NOTIFICATION_TYPE_LABELS.get(NotificationType(self.notification_type), self.notification_type)
-        except ValueError:
-            return self.notification_type
+        return NOTIFICATION_TYPE_LABELS_BY_VALUE.get(self.notification_type, self.notification_type)
 
     @property
     def type_icon(self) -> str:
-        try:
-            return NOTIFICATION_TYPE_ICONS.get(NotificationType(self.notification_type), "bi-bell")
-        except ValueError:
-            return "bi-bell"
+        return NOTIFICATION_TYPE_ICONS_BY_VALUE.get(self.notification_type, "bi-bell")
 
     @property
     def type_color(self) -> str:
-        try:
-            return NOTIFICATION_TYPE_COLORS.get(NotificationType(self.notification_type), "primary")
-        except ValueError:
-            return "primary"
+        return NOTIFICATION_TYPE_COLORS_BY_VALUE.get(self.notification_type, "primary")
 
 
 class NotificationPreference(Base):
@@ -4,16 +4,18 @@ TalaMala v4 - Notification Routes (Customer-facing)
 Notification center, mark-read, preferences, AJAX badge count.
 """
 
-from fastapi import APIRouter, Request, Depends, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi import APIRouter, Request, Depends, Form, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from config.database import get_db
 from common.templating import templates
-from common.security import csrf_check, new_csrf_token
+from common.helpers import safe_int, etag_matches
+from common.security import csrf_check, new_csrf_token, set_csrf_cookie
 from modules.auth.deps import require_login
 from modules.notification.service import notification_service
-from modules.notification.models import NotificationType, NOTIFICATION_TYPE_LABELS
+from modules.notification.models import NOTIFICATION_TYPE_VALUES, NOTIFICATION_TYPE_LABELS_BY_VALUE
 from modules.cart.service import cart_service
 
 router = APIRouter(tags=["notifications"])
@@ -26,28 +28,32 @@ router = APIRouter(tags=["notifications"])
 async def notification_list(
     request: Request,
     page: int = 1,
+    after: str = Query(None),
     db: Session = Depends(get_db),
     me=Depends(require_login),
 ):
-    notifications, total = notification_service.list_notifications(db, me.id, page=page)
+    notifications, total, notification_count, next_cursor = notification_service.list_notifications(
+        db, me.id, page=page, after_id=safe_int(after),
+    )
     total_pages = max(1, (total + 19) // 20)
 
     _, cart_count = cart_service.get_cart_map(db, me.id)
-    notification_count = notification_service.get_unread_count(db, me.id)
 
     csrf = new_csrf_token(request)
-    response = templates.TemplateResponse("shop/notifications.html", {
+    # Jinja render is CPU-bound: keep it off the event loop
+    response = await run_in_threadpool(templates.TemplateResponse, "shop/notifications.html", {
         "request": request,
         "user": me,
         "notifications": notifications,
         "total": total,
         "page": page,
         "total_pages": total_pages,
+        "next_cursor": next_cursor,
         "csrf_token": csrf,
         "cart_count": cart_count,
         "notification_count": notification_count,
     })
-    response.set_cookie("csrf_token", csrf, httponly=True, samesite="lax")
+    set_csrf_cookie(response, request, csrf)
     return response
 
 
@@ -88,11 +94,19 @@ async def mark_all_read(
 # ------------------------------------------------------------------
 @router.get("/notifications/api/unread-count")
 async def unread_count_api(
+    request: Request,
     db: Session = Depends(get_db),
     me=Depends(require_login),
 ):
     count = notification_service.get_unread_count(db, me.id)
-    return JSONResponse({"count": count})
+    # Unchanged count → header-only 304 for the poller
+    etag = f'W/"{count}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(
+        {"count": count},
+        headers={"ETag": etag, "Cache-Control": "private, max-age=5"},
+    )
 
 
 # ------------------------------------------------------------------
@@ -110,18 +124,19 @@ async def notification_settings_page(
     notification_count = notification_service.get_unread_count(db, me.id)
 
     csrf = new_csrf_token(request)
-    response = templates.TemplateResponse("shop/notification_settings.html", {
+    # Jinja render is CPU-bound: keep it off the event loop
+    response = await run_in_threadpool(templates.TemplateResponse, "shop/notification_settings.html", {
         "request": request,
         "user": me,
         "preferences": prefs,
-        "type_labels": NOTIFICATION_TYPE_LABELS,
-        "notification_types": NotificationType,
+        "type_labels": NOTIFICATION_TYPE_LABELS_BY_VALUE,
+        "notification_types": NOTIFICATION_TYPE_VALUES,
         "csrf_token": csrf,
         "cart_count": cart_count,
         "notification_count": notification_count,
         "msg": msg,
     })
-    response.set_cookie("csrf_token", csrf, httponly=True, samesite="lax")
+    set_csrf_cookie(response, request, csrf)
     return response
 
 
@@ -139,11 +154,11 @@ async def save_notification_settings(
     form_data = await request.form()
 
     prefs = {}
-    for nt in NotificationType:
-        prefs[nt.value] = {
-            "sms": f"sms_{nt.value}" in form_data,
-            "in_app": f"inapp_{nt.value}" in form_data,
-            "email": f"email_{nt.value}" in form_data,
+    for nt in NOTIFICATION_TYPE_VALUES:
+        prefs[nt] = {
+            "sms": f"sms_{nt}" in form_data,
+            "in_app": f"inapp_{nt}" in form_data,
+            "email": f"email_{nt}" in form_data,
         }
 
     notification_service.save_preferences(db, me.id, prefs)
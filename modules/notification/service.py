@@ -8,21 +8,35 @@ Includes admin SMS alert dispatch for critical events.
 
 import logging
 import threading
-from typing import Optional, Tuple, List, Dict
+from itertools import islice
+from typing import Optional, Tuple, List, Dict, Iterable
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import Integer, String, column, desc, func, insert, select, tuple_, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from modules.notification.models import (
     Notification, NotificationPreference,
-    NotificationType, NotificationChannel, NOTIFICATION_TYPE_LABELS,
+    NotificationChannel, NOTIFICATION_TYPE_LABELS, NOTIFICATION_TYPE_VALUES,
+    NOTIFICATION_DEDUP_REFERENCE_TYPES, NOTIFICATION_DEDUP_WHERE,
 )
 
 logger = logging.getLogger("talamala.notification")
 
+# Every notification type as an inline VALUES table (pos keeps enum order)
+_ALL_TYPES = values(
+    column("type", String), column("pos", Integer), name="t",
+).data([(nt, pos) for pos, nt in enumerate(NOTIFICATION_TYPE_VALUES)])
+
 
 class NotificationService:
 
+    # Default channels when a user has no saved preference row
+    _DEFAULT_PREFS = {"sms": True, "in_app": True, "email": False}
+
+    # Recipients handled per round-trip in send_bulk()
+    BULK_CHUNK_SIZE = 2000
+
     # ------------------------------------------------------------------
     # Core: Send Notification
     # ------------------------------------------------------------------
@@ -42,7 +56,7 @@ class NotificationService:
         metadata: dict = None,
         background_tasks=None,
         admin_alert_text: str = None,
-    ) -> Optional[Notification]:
+    ) -> Optional[int]:
         """
         Central dispatcher. Creates in-app notification (sync) and sends SMS (async).
 
@@ -62,35 +76,72 @@ class NotificationService:
             admin_alert_text: SMS text for admin alerts (no links). Falls back to title.
 
         Returns:
-            Notification object or None
+            New in-app notification id, or None if in-app is disabled or the
+            one-shot event (NOTIFICATION_DEDUP_REFERENCE_TYPES) was already sent
         """
         # 1. Check preferences
         prefs = self._get_preferences(db, user_id, notification_type)
 
+        # SMS needs the user's mobile; unless the caller passed it (or it is
+        # already cached) it rides along with the notification INSERT below.
+        want_sms = prefs["sms"] and bool(sms_text)
+        mobiles = db.info.setdefault("_notif_mobiles", {})
+        fetch_mobile = want_sms and not sms_mobile and user_id not in mobiles
+
+        # One-shot events are deduplicated through uq_notification_dedup. When
+        # the user turned in-app off but still gets the SMS, a hidden row
+        # (channel=SMS, already read) is written anyway so a retried handler
+        # hits the same index and does not send the SMS twice.
+        dedup = reference_type in NOTIFICATION_DEDUP_REFERENCE_TYPES and reference_id is not None
+        record = prefs["in_app"] or (dedup and want_sms)
+
         # 2. Create IN_APP notification (synchronous — participates in caller's transaction)
-        notif = None
-        if prefs["in_app"]:
-            notif = Notification(
+        notif_id = None
+        if record:
+            # Pending caller objects (e.g. a just-created user) must exist first
+            db.flush()
+            ins = pg_insert(Notification).values(
                 user_id=user_id,
                 notification_type=notification_type,
                 title=title,
                 body=body,
                 link=link,
-                channel=NotificationChannel.IN_APP,
+                is_read=not prefs["in_app"],
+                channel=NotificationChannel.IN_APP if prefs["in_app"] else NotificationChannel.SMS,
                 reference_type=reference_type,
                 reference_id=reference_id,
                 metadata_json=metadata,
             )
-            db.add(notif)
-            db.flush()
+            if dedup:
+                # Already notified for this one-shot event (retried handler):
+                # no row comes back. ON CONFLICT rather than catching
+                # IntegrityError keeps the caller's transaction usable.
+                ins = ins.on_conflict_do_nothing(
+                    index_elements=["user_id", "notification_type", "reference_type", "reference_id"],
+                    index_where=NOTIFICATION_DEDUP_WHERE,
+                )
+            ins = ins.returning(Notification.id)
+            if fetch_mobile:
+                # WITH ins AS (INSERT ... RETURNING id) SELECT ins.id, (user's mobile)
+                from modules.user.models import User
+                ins = ins.cte("ins")
+                row = db.execute(select(
+                    ins.c.id,
+                    select(User.mobile).where(User.id == user_id).scalar_subquery(),
+                )).first()
+                if row:
+                    notif_id, mobiles[user_id] = row
+            else:
+                notif_id = db.execute(ins).scalar()
+            if dedup and notif_id is None:
+                logger.info(f"Duplicate notification skipped: user #{user_id} {reference_type}:{reference_id}")
+                return None
+            if not prefs["in_app"]:
+                notif_id = None  # SMS delivery record only, not an in-app notification
 
         # 3. Send SMS (async via BackgroundTasks, or sync fallback)
-        if prefs["sms"] and sms_text:
-            mobile = sms_mobile
-            if not mobile:
-                from modules.user.models import User
-                user = db.query(User).filter(User.id == user_id).first()
-                mobile = user.mobile if user else None
+        if want_sms:
+            mobile = sms_mobile or self._get_mobile(db, user_id)
 
             if mobile:
                 if background_tasks is not None:
@@ -109,7 +160,103 @@ class NotificationService:
         # 5. Admin SMS alerts (fire-and-forget daemon thread with own DB session)
         self._maybe_send_admin_alerts(notification_type, admin_alert_text or title)
 
-        return notif
+        return notif_id
+
+    def send_bulk(
+        self,
+        db: Session,
+        recipients: Iterable[Tuple[int, Optional[str]]],
+        notification_type: str,
+        title: str,
+        body: str,
+        link: str = None,
+        sms_text: str = None,
+        reference_type: str = None,
+        reference_id: str = None,
+        metadata: dict = None,
+        background_tasks=None,
+        admin_alert_text: str = None,
+    ) -> int:
+        """
+        Batched variant of send() for broadcasts: same message to many users.
+
+        Recipients are consumed in chunks of BULK_CHUNK_SIZE, so a streamed
+        result (yield_per) never has to be materialized. Per chunk: one
+        preference lookup, one multi-row INSERT and one SMS background task.
+
+        Args:
+            recipients: (user_id, mobile) pairs, e.g. rows of select(User.id, User.mobile)
+            (other args as in send())
+
+        Returns:
+            Number of recipients processed
+        """
+        it = iter(recipients)
+        total = 0
+        while chunk := list(islice(it, self.BULK_CHUNK_SIZE)):
+            self._send_bulk_chunk(
+                db, chunk, notification_type, title, body, link, sms_text,
+                reference_type, reference_id, metadata, background_tasks,
+            )
+            total += len(chunk)
+
+        if total:
+            self._maybe_send_admin_alerts(notification_type, admin_alert_text or title)
+
+        return total
+
+    def _send_bulk_chunk(
+        self, db: Session, chunk: List[Tuple[int, Optional[str]]],
+        notification_type, title, body, link, sms_text,
+        reference_type, reference_id, metadata, background_tasks,
+    ):
+        user_ids = [uid for uid, _ in chunk]
+        prefs_by_user = self._get_bulk_preferences(db, user_ids, notification_type)
+
+        rows = []
+        sms_mobiles = []
+        email_count = 0
+        for uid, mobile in chunk:
+            prefs = prefs_by_user.get(uid) or self._DEFAULT_PREFS
+            if prefs["in_app"]:
+                rows.append({
+                    "user_id": uid,
+                    "notification_type": notification_type,
+                    "title": title,
+                    "body": body,
+                    "link": link,
+                    "channel": NotificationChannel.IN_APP,
+                    "reference_type": reference_type,
+                    "reference_id": reference_id,
+                    "metadata_json": metadata,
+                })
+            if prefs["sms"] and sms_text and mobile:
+                sms_mobiles.append(mobile)
+            if prefs["email"]:
+                email_count += 1
+
+        # executemany → batched INSERT ... VALUES (insertmanyvalues, 1000 rows/page)
+        if rows:
+            db.execute(insert(Notification), rows)
+
+        if sms_mobiles:
+            if background_tasks is not None:
+                background_tasks.add_task(self._send_sms_batch, sms_mobiles, sms_text)
+            else:
+                threading.Thread(
+                    target=self._send_sms_batch, args=(sms_mobiles, sms_text), daemon=True
+                ).start()
+
+        if email_count:
+            logger.info(f"[EMAIL STUB] To {email_count} users: {title}")
+
+    def _get_mobile(self, db: Session, user_id: int) -> Optional[str]:
+        """User's mobile (one-column SELECT), remembered for the DB session."""
+        cache = db.info.setdefault("_notif_mobiles", {})
+        if user_id not in cache:
+            from modules.user.models import User
+            cache[user_id] = db.scalar(select(User.mobile).where(User.id == user_id))
+        return cache[user_id]
 
     # ------------------------------------------------------------------
     # Preferences
@@ -117,65 +264,100 @@ class NotificationService:
 
     def _get_preferences(self, db: Session, user_id: int, notification_type: str) -> Dict[str, bool]:
         """Get user's channel preferences for a notification type."""
-        pref = db.query(NotificationPreference).filter(
-            NotificationPreference.user_id == user_id,
-            NotificationPreference.notification_type == notification_type,
-        ).first()
-
-        if pref:
-            return {
-                "sms": pref.sms_enabled,
-                "in_app": pref.in_app_enabled,
-                "email": pref.email_enabled,
-            }
-
+        nt_val = notification_type.value if hasattr(notification_type, "value") else str(notification_type)
         # Default: SMS + In-app enabled, email disabled
-        return {"sms": True, "in_app": True, "email": False}
+        return dict(self._get_user_preferences(db, user_id).get(nt_val, self._DEFAULT_PREFS))
 
-    def get_all_preferences(self, db: Session, user_id: int) -> Dict[str, Dict[str, bool]]:
-        """Get all preferences for settings page."""
-        existing = db.query(NotificationPreference).filter(
-            NotificationPreference.user_id == user_id,
-        ).all()
+    def _get_user_preferences(self, db: Session, user_id: int) -> Dict[str, Dict[str, bool]]:
+        """All saved preference rows of a user, loaded once per DB session.
 
-        pref_map = {}
-        for p in existing:
-            pref_map[p.notification_type] = {
-                "sms": p.sms_enabled,
-                "in_app": p.in_app_enabled,
-                "email": p.email_enabled,
+        A single business event often notifies the same user several times;
+        the map is kept in db.info so only the first send() hits the table.
+        """
+        cache = db.info.setdefault("_notif_prefs", {})
+        user_prefs = cache.get(user_id)
+        if user_prefs is None:
+            rows = db.execute(
+                select(
+                    NotificationPreference.notification_type,
+                    NotificationPreference.sms_enabled,
+                    NotificationPreference.in_app_enabled,
+                    NotificationPreference.email_enabled,
+                ).where(NotificationPreference.user_id == user_id)
+            ).all()
+            user_prefs = cache[user_id] = {
+                nt: {"sms": sms, "in_app": in_app, "email": email}
+                for nt, sms, in_app, email in rows
             }
+        return user_prefs
+
+    def _get_bulk_preferences(
+        self, db: Session, user_ids: List[int], notification_type: str,
+    ) -> Dict[int, Dict[str, bool]]:
+        """Channel preferences for many users at once (users without a row are omitted)."""
+        rows = db.execute(
+            select(
+                NotificationPreference.user_id,
+                NotificationPreference.sms_enabled,
+                NotificationPreference.in_app_enabled,
+                NotificationPreference.email_enabled,
+            ).where(
+                NotificationPreference.notification_type == notification_type,
+                NotificationPreference.user_id.in_(user_ids),
+            )
+        ).all()
+        return {
+            uid: {"sms": sms, "in_app": in_app, "email": email}
+            for uid, sms, in_app, email in rows
+        }
 
-        result = {}
-        for nt in NotificationType:
-            if nt.value in pref_map:
-                result[nt.value] = pref_map[nt.value]
-            else:
-                result[nt.value] = {"sms": True, "in_app": True, "email": False}
+    def get_all_preferences(self, db: Session, user_id: int) -> Dict[str, Dict[str, bool]]:
+        """Get all preferences for settings page.
 
-        return result
+        Every type comes back from one query: a VALUES list of all types
+        LEFT JOINed to the user's saved rows, with defaults via COALESCE.
+        """
+        P = NotificationPreference
+        rows = db.execute(
+            select(
+                _ALL_TYPES.c.type,
+                func.coalesce(P.sms_enabled, True),
+                func.coalesce(P.in_app_enabled, True),
+                func.coalesce(P.email_enabled, False),
+            )
+            .select_from(_ALL_TYPES.outerjoin(
+                P, (P.notification_type == _ALL_TYPES.c.type) & (P.user_id == user_id),
+            ))
+            .order_by(_ALL_TYPES.c.pos)
+        ).all()
+        return {
+            nt: {"sms": sms, "in_app": in_app, "email": email}
+            for nt, sms, in_app, email in rows
+        }
 
     def save_preferences(self, db: Session, user_id: int, prefs: Dict[str, Dict[str, bool]]):
-        """Save bulk preferences from settings form."""
-        for type_val, channels in prefs.items():
-            existing = db.query(NotificationPreference).filter(
-                NotificationPreference.user_id == user_id,
-                NotificationPreference.notification_type == type_val,
-            ).first()
-
-            if existing:
-                existing.sms_enabled = channels.get("sms", True)
-                existing.in_app_enabled = channels.get("in_app", True)
-                existing.email_enabled = channels.get("email", False)
-            else:
-                db.add(NotificationPreference(
-                    user_id=user_id,
-                    notification_type=type_val,
-                    sms_enabled=channels.get("sms", True),
-                    in_app_enabled=channels.get("in_app", True),
-                    email_enabled=channels.get("email", False),
-                ))
-        db.flush()
+        """Save bulk preferences from settings form (one UPSERT for all types)."""
+        if not prefs:
+            return
+        db.info.get("_notif_prefs", {}).pop(user_id, None)
+        stmt = pg_insert(NotificationPreference).values([
+            {
+                "user_id": user_id,
+                "notification_type": type_val,
+                "sms_enabled": channels.get("sms", True),
+                "in_app_enabled": channels.get("in_app", True),
+                "email_enabled": channels.get("email", False),
+            }
+            for type_val, channels in prefs.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            constraint="uq_notif_pref_user_type",
+            set_={
+                "sms_enabled": stmt.excluded.sms_enabled,
+                "in_app_enabled": stmt.excluded.in_app_enabled,
+                "email_enabled": stmt.excluded.email_enabled,
+            },
+        ))
 
     # ------------------------------------------------------------------
     # Queries
@@ -183,37 +365,89 @@ class NotificationService:
 
     def get_unread_count(self, db: Session, user_id: int) -> int:
         """Count of unread in-app notifications (for badge)."""
-        return db.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == False,
-        ).count()
+        # Same predicate as ix_notification_user_unread_partial → index-only count
+        return db.scalar(
+            select(func.count())
+            .select_from(Notification)
+            .where(Notification.user_id == user_id, Notification.is_read == False)
+        )
 
     def list_notifications(
         self, db: Session, user_id: int,
         page: int = 1, per_page: int = 20,
-    ) -> Tuple[List[Notification], int]:
-        """Paginated notification list for notification center."""
-        q = db.query(Notification).filter(Notification.user_id == user_id)
-        total = q.count()
-        items = (
-            q.order_by(desc(Notification.created_at))
-            .offset((page - 1) * per_page)
+        after_id: Optional[int] = None,
+    ) -> Tuple[List[Notification], int, int, Optional[int]]:
+        """Paginated notification list for notification center.
+
+        Returns (items, total, unread, next_cursor). The badge count comes from
+        the same query on offset pages. `after_id` (the previous page's last
+        id) seeks on (created_at, id) via ix_notification_user_created instead
+        of skipping rows with OFFSET; next_cursor is the id to pass for the
+        following page.
+        """
+        # Totals ride along on every page row (window aggregates are computed
+        # before LIMIT); only a page past the end needs a separate COUNT.
+        unread_filter = Notification.is_read == False
+        paged = (
+            select(
+                Notification,
+                func.count().over().label("_total"),
+                func.count().filter(unread_filter).over().label("_unread"),
+            )
+            .where(
+                Notification.user_id == user_id,
+                Notification.channel == NotificationChannel.IN_APP,
+            )
+            # The list template reads only columns; any relationship access
+            # should fail loudly rather than lazy-load once per row
+            .options(raiseload("*"))
+            .order_by(desc(Notification.created_at), desc(Notification.id))
             .limit(per_page)
-            .all()
         )
-        return items, total
+        skipped = (page - 1) * per_page
+        unread = None
+        if after_id:
+            # Keyset: the window covers only rows after the cursor, so the
+            # total adds the `skipped` earlier pages and unread is counted apart
+            cursor_created = (
+                select(Notification.created_at)
+                .where(Notification.id == after_id, Notification.user_id == user_id)
+                .scalar_subquery()
+            )
+            rows = db.execute(paged.where(
+                tuple_(Notification.created_at, Notification.id) < tuple_(cursor_created, after_id)
+            )).all()
+            total = skipped + rows[0]._total if rows else None
+            unread = self.get_unread_count(db, user_id)
+        else:
+            rows = db.execute(paged.offset(skipped)).all()
+            if rows:
+                total, unread = rows[0]._total, rows[0]._unread
+            else:
+                total = None
+        if total is None and page > 1:
+            total, unread = db.execute(
+                select(func.count(), func.count().filter(unread_filter))
+                .select_from(Notification)
+                .where(
+                    Notification.user_id == user_id,
+                    Notification.channel == NotificationChannel.IN_APP,
+                )
+            ).one()
+        elif total is None:
+            total, unread = 0, 0
+        items = [row[0] for row in rows]
+        next_cursor = items[-1].id if items and page * per_page < total else None
+        return items, total, unread, next_cursor
 
     def mark_as_read(self, db: Session, user_id: int, notification_id: int) -> bool:
-        """Mark a single notification as read."""
-        notif = db.query(Notification).filter(
+        """Mark a single notification as read (one conditional UPDATE)."""
+        count = db.query(Notification).filter(
             Notification.id == notification_id,
             Notification.user_id == user_id,
-        ).first()
-        if notif and not notif.is_read:
-            notif.is_read = True
-            db.flush()
-            return True
-        return False
+            Notification.is_read == False,
+        ).update({"is_read": True}, synchronize_session=False)
+        return count > 0
 
     def mark_all_read(self, db: Session, user_id: int) -> int:
         """Mark all unread notifications as read. Returns count updated."""
@@ -299,6 +533,14 @@ class NotificationService:
         except Exception as e:
             logger.error(f"SMS send failed to {mobile}: {e}")
 
+    def _send_sms_batch(self, mobiles: List[str], text: str):
+        """Send the same SMS to many mobiles via the provider's multi-receptor API."""
+        try:
+            from common.sms import sms_sender
+            sms_sender.send_plain_text_bulk(mobiles, text)
+        except Exception as e:
+            logger.error(f"Bulk SMS send failed ({len(mobiles)} mobiles): {e}")
+
 
 # Singleton
 notification_service = NotificationService()
@@ -14,6 +14,7 @@ from sqlalchemy.orm import Session
 
 from config.database import get_db
 from common.templating import templates
+from common.helpers import safe_int
 from common.security import csrf_check, new_csrf_token
 from modules.auth.deps import require_permission
 from modules.order.service import order_service
@@ -30,12 +31,18 @@ async def admin_orders(
     status: str = Query(None),
     delivery: str = Query(None),
     search: str = Query(None),
+    page: int = 1,
+    after: str = Query(None),
     msg: str = Query(None),
     error: str = Query(None),
     db: Session = Depends(get_db),
     user=Depends(require_permission("orders")),
 ):
-    orders = order_service.get_all_orders(db, status=status, delivery=delivery, search=search)
+    page = max(1, page)
+    orders, total, total_pages, next_cursor = order_service.get_all_orders(
+        db, status=status, delivery=delivery, search=search,
+        page=page, after_id=safe_int(after),
+    )
     pending_stats = order_service.get_pending_delivery_stats(db)
 
     csrf = new_csrf_token(request)
@@ -43,6 +50,10 @@ async def admin_orders(
         "request": request,
         "user": user,
         "orders": orders,
+        "page": page,
+        "total": total,
+        "total_pages": total_pages,
+        "next_cursor": next_cursor,
         "pending_stats": pending_stats,
         "status_filter": status or "",
         "delivery_filter": delivery or "",
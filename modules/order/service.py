@@ -5,12 +5,13 @@ Checkout, order creation, inventory reservation, expiration cleanup.
 """
 
 import logging
+import math
 from decimal import Decimal
 from datetime import timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
+from sqlalchemy import desc, func, or_
 
 from common.helpers import now_utc, generate_unique_claim_code
 from common.templating import get_setting_from_db
@@ -931,8 +932,18 @@ class OrderService:
             },
         }
 
-    def get_all_orders(self, db: Session, status: str = None, delivery: str = None, search: str = None) -> List[Order]:
-        q = db.query(Order).order_by(desc(Order.id))
+    def get_all_orders(
+        self, db: Session, status: str = None, delivery: str = None, search: str = None,
+        page: int = 1, per_page: int = 50, after_id: Optional[int] = None,
+    ) -> Tuple[List[Order], int, int, Optional[int]]:
+        """
+        Admin order list, newest first. Returns (orders, total, total_pages, next_cursor).
+
+        `after_id` (last id of the previous page) seeks on the primary key
+        instead of skipping rows with OFFSET, so deep pages cost the same as
+        the first one; next_cursor is the id to pass for the following page.
+        """
+        q = db.query(Order, func.count().over().label("_total")).order_by(desc(Order.id))
         if status:
             q = q.filter(Order.status == status)
         if delivery:
@@ -945,7 +956,23 @@ class OrderService:
                     User.last_name.ilike(term),
                     User.mobile.ilike(term))
             )
-        return q.all()
+
+        # Total rides along on every page row; only a page past the end needs
+        # a separate COUNT (the window sees just the rows after the cursor).
+        skipped = (page - 1) * per_page
+        if after_id:
+            rows = q.filter(Order.id < after_id).limit(per_page).all()
+            total = skipped + rows[0]._total if rows else None
+        else:
+            rows = q.offset(skipped).limit(per_page).all()
+            total = rows[0]._total if rows else None
+        if total is None:
+            total = q.with_entities(Order.id).order_by(None).count() if page > 1 else 0
+
+        orders = [row[0] for row in rows]
+        total_pages = math.ceil(total / per_page) if total else 1
+        next_cursor = orders[-1].id if orders and page < total_pages else None
+        return orders, total, total_pages, next_cursor
 
     # ==========================================
     # Private Helpers
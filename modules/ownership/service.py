@@ -13,8 +13,8 @@ from common.helpers import now_utc, generate_unique_claim_code
 from common.security import generate_otp, hash_otp
 from modules.inventory.models import (
     Bar, BarStatus, OwnershipHistory, BarTransfer, TransferStatus,
-    CustodialDeliveryRequest, CustodialDeliveryStatus,
-    DealerTransfer, TransferType,
+    CustodialDeliveryRequest, CustodialDeliveryStatus, CUSTODIAL_DELIVERY_STATUS_VALUES,
+    DealerTransfer, TransferType, enum_eq,
 )
 from modules.user.models import User
 
@@ -463,7 +463,9 @@ class OwnershipService:
             CustodialDeliveryRequest.dealer_id == dealer_id,
         )
         if status_filter:
-            query = query.filter(CustodialDeliveryRequest.status == status_filter)
+            query = query.filter(
+                enum_eq(CustodialDeliveryRequest.status, status_filter, CUSTODIAL_DELIVERY_STATUS_VALUES)
+            )
         return query.order_by(CustodialDeliveryRequest.created_at.desc()).all()
 
     def get_delivery_request(self, db: Session, request_id: int) -> Optional[CustodialDeliveryRequest]:
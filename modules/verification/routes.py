@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from config.database import get_db
 from common.templating import templates
+from common.helpers import etag_matches
 from modules.inventory.models import Bar, BarStatus, OwnershipHistory
 from modules.verification.service import verification_service
 
@@ -91,17 +92,26 @@ async def verify_check(
 # ==========================================
 
 @router.get("/qr/{serial_code}.png")
-async def qr_code_image(serial_code: str, db: Session = Depends(get_db)):
-    """Generate and return QR code PNG for a bar's serial code."""
+async def qr_code_image(request: Request, serial_code: str, db: Session = Depends(get_db)):
+    """Generate and return QR code PNG for a bar's serial code.
+
+    Supports If-None-Match: a repeat fetch of an unchanged QR gets a bodiless
+    304 and skips rasterization entirely.
+    """
     bar = db.query(Bar).filter(Bar.serial_code == serial_code.upper()).first()
     if not bar:
         return Response(status_code=404, content=b"Not found")
 
-    png_bytes = verification_service.generate_qr_for_print(bar.serial_code)
+    etag = verification_service.qr_etag(bar.serial_code)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    png_bytes = await verification_service.render_qr_for_print(bar.serial_code)
     return Response(
         content=png_bytes,
         media_type="image/png",
-        headers={"Cache-Control": "no-cache"},
+        headers=headers,
     )
 
 
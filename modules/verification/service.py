@@ -4,17 +4,63 @@ Verification Service - QR Code Generation
 Generate QR codes for gold bars linking to the public verification page.
 High-res QR + serial text for laser printing on packaging.
 
-SECURITY: QR images are generated on-the-fly (never saved to disk).
+SECURITY: QR images are generated on-the-fly (never saved to disk); rendered
+PNGs are only kept in a bounded in-process memory cache.
 Only accessible via authenticated admin endpoint.
 """
 
+import asyncio
+import hashlib
 import io
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import qrcode
 from qrcode.image.pil import PilImage
 from PIL import Image, ImageDraw, ImageFont
 
 from config.settings import BASE_URL
 
+# Bump when the print layout changes so clients drop cached QR images.
+QR_RENDER_VERSION = "1"
+
+# PIL rasterization is CPU-bound; print renders run in worker processes so the
+# event loop is never blocked. Created lazily on first use. Workers come from a
+# forkserver, not fork(): forking the running app would copy the DB pool's
+# sockets, the event loop and any held locks into each child.
+_qr_pool: ProcessPoolExecutor | None = None
+
+
+# Rendered print PNGs are a pure function of the serial, so keep a bounded
+# in-memory LRU (~20 KB each). Memory only — QR images must never touch disk.
+QR_CACHE_MAX_ENTRIES = 512
+_qr_cache: "OrderedDict[str, bytes]" = OrderedDict()
+
+
+def _get_qr_pool() -> ProcessPoolExecutor:
+    global _qr_pool
+    if _qr_pool is None:
+        _qr_pool = ProcessPoolExecutor(
+            max_workers=min(4, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _qr_pool
+
+
+def shutdown_qr_pool() -> None:
+    """Stop the QR worker processes (called on app shutdown)."""
+    global _qr_pool
+    if _qr_pool is not None:
+        _qr_pool.shutdown(wait=False, cancel_futures=True)
+        _qr_pool = None
+
+
+def _render_qr_for_print(serial_code: str) -> bytes:
+    """Module-level (picklable) entry point executed inside the worker pool."""
+    return verification_service.generate_qr_for_print(serial_code)
+
 
 class VerificationService:
 
@@ -99,6 +145,26 @@ class VerificationService:
         buf.seek(0)
         return buf.getvalue()
 
+    def qr_etag(self, serial_code: str) -> str:
+        """Strong ETag for a bar's print QR (depends only on serial + verify URL + layout)."""
+        key = f"{QR_RENDER_VERSION}|{BASE_URL}|{serial_code}".encode("utf-8")
+        return '"%s"' % hashlib.blake2b(key, digest_size=8).hexdigest()
+
+    async def render_qr_for_print(self, serial_code: str) -> bytes:
+        """Async wrapper: serve from the in-memory LRU, else render in the process pool."""
+        png = _qr_cache.get(serial_code)
+        if png is not None:
+            _qr_cache.move_to_end(serial_code)
+            return png
+
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(_get_qr_pool(), _render_qr_for_print, serial_code)
+
+        _qr_cache[serial_code] = png
+        if len(_qr_cache) > QR_CACHE_MAX_ENTRIES:
+            _qr_cache.popitem(last=False)
+        return png
+
     def _get_font(self, size: int = 40) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
         """Try to load a good bold monospace font, fall back to default."""
         font_candidates = [
@@ -261,6 +261,28 @@ def setup_test_database():
             UPDATE users SET can_distribute = true WHERE mobile = :m AND is_dealer = true
         """), {"m": DEALER_MOBILE})
 
+        # 15. Reconciliation fixture bars at dealer D2: TSRC0001-3 on hand,
+        #     TSRC0004 a preorder (never expected on the shelf)
+        r = conn.execute(text("SELECT id FROM users WHERE mobile = :m"), {"m": DEALER2_MOBILE})
+        dealer2_row = r.fetchone()
+        r = conn.execute(text("SELECT id FROM products WHERE is_active = true LIMIT 1"))
+        prod_row = r.fetchone()
+        if dealer2_row and prod_row:
+            for serial, preorder in [('TSRC0001', False), ('TSRC0002', False),
+                                     ('TSRC0003', False), ('TSRC0004', True)]:
+                r = conn.execute(text("SELECT id FROM bars WHERE serial_code = :s"), {"s": serial})
+                if not r.fetchone():
+                    conn.execute(text("""
+                        INSERT INTO bars (serial_code, status, product_id, dealer_id, is_preorder)
+                        VALUES (:s, 'Assigned', :pid, :did, :pre)
+                    """), {"s": serial, "pid": prod_row[0], "did": dealer2_row[0], "pre": preorder})
+                else:
+                    conn.execute(text("""
+                        UPDATE bars SET status = 'Assigned', dealer_id = :did, is_preorder = :pre,
+                            customer_id = NULL, reserved_customer_id = NULL, reserved_until = NULL
+                        WHERE serial_code = :s
+                    """), {"s": serial, "did": dealer2_row[0], "pre": preorder})
+
     print("  ✅ Test database setup complete")
 
 
@@ -1484,6 +1506,302 @@ def run_flow_ticket():
     return suite
 
 
+def run_flow_reconciliation():
+    """Flow 7: Reconciliation scan → finalize — duplicate scans, summary counts, Missing rows."""
+    suite = TestSuite("FLOW-07: انبارگردانی (اسکن + نهایی‌سازی)")
+    print(f"\n{'='*60}\n  {suite.name}\n{'='*60}")
+
+    a = get_session(ADMIN_MOBILE)
+    dealer_id = get_user_id(DEALER2_MOBILE)
+    if not dealer_id:
+        suite.add("FLOW-07-00", "نماینده D2 پیدا نشد", False)
+        return suite
+
+    # Only one active session per dealer: close leftovers from earlier runs
+    db_exec("""
+        UPDATE reconciliation_sessions SET status = 'Cancelled', completed_at = now()
+        WHERE dealer_id = :did AND status = 'InProgress'
+    """, {"did": dealer_id})
+
+    # Step 1: Start session
+    r = a.post(f"{BASE_URL}/admin/reconciliation/start", data={
+        "dealer_id": dealer_id,
+        "csrf_token": get_csrf(a),
+    }, follow_redirects=False)
+    location = r.headers.get("location", "")
+    m = re.search(r'/admin/reconciliation/(\d+)', location)
+    suite.add("FLOW-07-01", "شروع انبارگردانی → redirect",
+              r.status_code in (302, 303) and m is not None,
+              f"status={r.status_code}, location={location}")
+    if not m:
+        return suite
+    session_id = int(m.group(1))
+
+    # Step 2: Scan an on-hand bar, then the same serial again
+    r = _post(a, f"/admin/reconciliation/{session_id}/scan", {"serial": "TSRC0001"})
+    body = r.json() if r.status_code == 200 else {}
+    suite.add("FLOW-07-02", "اسکن TSRC0001 → matched",
+              body.get("status") == "matched", f"body={r.text[:200]}")
+
+    r = _post(a, f"/admin/reconciliation/{session_id}/scan", {"serial": "tsrc0001 "})
+    body = r.json() if r.status_code == 200 else {}
+    suite.add("FLOW-07-03", "اسکن تکراری رد شد",
+              body.get("duplicate") is True, f"body={r.text[:200]}")
+
+    item_count = db_scalar("""
+        SELECT COUNT(*) FROM reconciliation_items
+        WHERE session_id = :sid AND serial_code = 'TSRC0001'
+    """, {"sid": session_id})
+    scanned = db_scalar(
+        "SELECT total_scanned FROM reconciliation_sessions WHERE id = :sid", {"sid": session_id})
+    suite.add("FLOW-07-04", "اسکن تکراری ردیف/شمارنده اضافه نکرد",
+              item_count == 1 and scanned == 1,
+              f"items={item_count}, total_scanned={scanned}")
+
+    # Step 3: Scan a bar held by another dealer
+    r = _post(a, f"/admin/reconciliation/{session_id}/scan", {"serial": "TSFL0001"})
+    body = r.json() if r.status_code == 200 else {}
+    suite.add("FLOW-07-05", "اسکن شمش نماینده دیگر → unexpected",
+              body.get("status") == "unexpected", f"body={r.text[:200]}")
+
+    # Everything D2 should hold, minus the one bar scanned, becomes Missing
+    expected_missing = db_scalar("""
+        SELECT COUNT(*) FROM bars
+        WHERE dealer_id = :did AND status IN ('Assigned', 'Reserved')
+          AND is_preorder = false AND serial_code != 'TSRC0001'
+    """, {"did": dealer_id})
+
+    # Step 4: Finalize
+    r = a.post(f"{BASE_URL}/admin/reconciliation/{session_id}/finalize", data={
+        "notes": "تست فرایندی",
+        "csrf_token": get_csrf(a),
+    }, follow_redirects=False)
+    suite.add("FLOW-07-06", "نهایی‌سازی → redirect",
+              r.status_code in (302, 303), f"status={r.status_code}")
+
+    row = db_query("""
+        SELECT status, total_matched, total_unexpected, total_missing
+        FROM reconciliation_sessions WHERE id = :sid
+    """, {"sid": session_id})
+    status, matched, unexpected, missing = row[0] if row else (None, None, None, None)
+    suite.add("FLOW-07-07", "وضعیت Completed",
+              status == "Completed", f"status={status}")
+    suite.add("FLOW-07-08", "شمارش matched/unexpected/missing",
+              (matched, unexpected, missing) == (1, 1, expected_missing),
+              f"matched={matched}, unexpected={unexpected}, missing={missing}, "
+              f"expected_missing={expected_missing}")
+
+    missing_serials = {r[0] for r in db_query("""
+        SELECT serial_code FROM reconciliation_items
+        WHERE session_id = :sid AND item_status = 'Missing'
+    """, {"sid": session_id})}
+    suite.add("FLOW-07-09", "ردیف Missing برای شمش اسکن‌نشده",
+              {"TSRC0002", "TSRC0003"} <= missing_serials,
+              f"missing={sorted(missing_serials)[:10]}")
+    suite.add("FLOW-07-10", "شمش اسکن‌شده و پیش‌فروش در Missing نیستند",
+              not missing_serials & {"TSRC0001", "TSRC0004"},
+              f"missing={sorted(missing_serials)[:10]}")
+    suite.add("FLOW-07-11", "تعداد ردیف‌های Missing = total_missing",
+              len(missing_serials) == missing, f"rows={len(missing_serials)}, total={missing}")
+
+    return suite
+
+
+def run_flow_keyset_pagination():
+    """Flow 8: after=<id> cursor paging — notification center and admin order list."""
+    suite = TestSuite("FLOW-08: صفحه‌بندی با cursor (اعلان‌ها + سفارشات)")
+    print(f"\n{'='*60}\n  {suite.name}\n{'='*60}")
+
+    c = get_session(CUSTOMER3_MOBILE)
+    a = get_session(ADMIN_MOBILE)
+    uid = get_user_id(CUSTOMER3_MOBILE)
+    other_uid = get_user_id(CUSTOMER2_MOBILE)
+    if not uid or not other_uid:
+        suite.add("FLOW-08-00", "کاربر تست پیدا نشد", False)
+        return suite
+
+    # 45 notifications from one INSERT share one created_at: only the id
+    # tie-breaker keeps the page boundaries stable
+    db_exec("DELETE FROM notifications WHERE title = 'TSPG'")
+    db_exec("""
+        INSERT INTO notifications (user_id, notification_type, title, body, channel)
+        SELECT :uid, 'SYSTEM', 'TSPG', 'keyset ' || g, 'IN_APP' FROM generate_series(1, 45) g
+    """, {"uid": uid})
+    db_exec("""
+        INSERT INTO notifications (user_id, notification_type, title, body, channel)
+        VALUES (:uid, 'SYSTEM', 'TSPG', 'foreign', 'IN_APP')
+    """, {"uid": other_uid})
+    inserted = {r[0] for r in db_query(
+        "SELECT id FROM notifications WHERE user_id = :uid AND title = 'TSPG'", {"uid": uid})}
+    foreign_id = db_scalar(
+        "SELECT id FROM notifications WHERE user_id = :uid AND title = 'TSPG'", {"uid": other_uid})
+    expected = db_scalar(
+        "SELECT COUNT(*) FROM notifications WHERE user_id = :uid AND channel = 'IN_APP'", {"uid": uid})
+
+    # Walk the "next" links until they stop carrying a cursor
+    seen, path, cursor_ok = [], "/notifications", True
+    for _ in range(expected // 20 + 2):
+        r = _get(c, path)
+        ids = [int(x) for x in re.findall(r'id="notif-(\d+)"', r.text)]
+        seen += ids
+        m = re.search(r'href="/notifications\?page=(\d+)&after=(\d+)"', r.text)
+        if not m:
+            break
+        cursor_ok = cursor_ok and bool(ids) and int(m.group(2)) == ids[-1]
+        path = f"/notifications?page={m.group(1)}&after={m.group(2)}"
+
+    suite.add("FLOW-08-01", "cursor لینک بعدی = آخرین اعلان صفحه", cursor_ok)
+    suite.add("FLOW-08-02", "پیمایش با after بدون تکرار",
+              len(seen) == len(set(seen)), f"seen={len(seen)}, unique={len(set(seen))}")
+    suite.add("FLOW-08-03", "پیمایش با after بدون جاافتادگی (created_at یکسان)",
+              len(seen) == expected and inserted <= set(seen),
+              f"seen={len(seen)}, expected={expected}, "
+              f"missing={len(inserted - set(seen))}")
+
+    # A cursor that is not this user's row (or no longer exists) is an empty page
+    r = _get(c, f"/notifications?page=2&after={foreign_id}")
+    suite.add("FLOW-08-04", "after متعلق به کاربر دیگر → صفحه خالی",
+              r.status_code == 200 and 'id="notif-' not in r.text,
+              f"status={r.status_code}")
+
+    deleted_id = (db_scalar("SELECT MAX(id) FROM notifications") or 0) + 1000
+    r = _get(c, f"/notifications?page=2&after={deleted_id}")
+    suite.add("FLOW-08-05", "after حذف‌شده → صفحه خالی",
+              r.status_code == 200 and 'id="notif-' not in r.text,
+              f"status={r.status_code}")
+
+    db_exec("DELETE FROM notifications WHERE title = 'TSPG'")
+
+    # Admin orders: more than one page (50) of Cancelled orders for U5, so
+    # the filtered list renders page links
+    have = db_scalar(
+        "SELECT COUNT(*) FROM orders WHERE customer_id = :uid AND status = 'Cancelled'", {"uid": uid}) or 0
+    if have < 51:
+        db_exec("""
+            INSERT INTO orders (customer_id, total_amount, status, shipping_cost, insurance_cost,
+                                cancellation_reason, cancelled_at)
+            SELECT :uid, 1000, 'Cancelled', 0, 0, 'TSPG', now() FROM generate_series(1, :n)
+        """, {"uid": uid, "n": 51 - have})
+
+    qs = f"status=Cancelled&search={CUSTOMER3_MOBILE}"
+    r = _get(a, f"/admin/orders?{qs}")
+    m = re.search(r'href="/admin/orders\?page=2&after=(\d+)([^"]*)"', r.text)
+    suite.add("FLOW-08-06", "لینک صفحه بعد سفارشات فیلترها را نگه می‌دارد",
+              m is not None and m.group(2) == f"&{qs}",
+              f"link={m.group(0) if m else None}")
+    # Row "view" buttons only (the pending-pickup panels above link orders too)
+    order_row = r'href="/orders/(\d+)" class="btn btn-sm btn-tm-outline"'
+    page1 = {int(x) for x in re.findall(order_row, r.text)}
+
+    if m:
+        r = _get(a, f"/admin/orders?page=2&after={m.group(1)}{m.group(2)}")
+        page2 = {int(x) for x in re.findall(order_row, r.text)}
+        page2_customers = db_scalar(
+            "SELECT COUNT(DISTINCT customer_id) FROM orders WHERE id = ANY(:ids)",
+            {"ids": list(page2)}) if page2 else 0
+        suite.add("FLOW-08-07", "صفحه ۲ سفارشات: فیلتر اعمال شده و بدون تکرار",
+                  r.status_code == 200 and page2 and not page1 & page2 and page2_customers == 1
+                  and max(page2) < int(m.group(1)),
+                  f"status={r.status_code}, page2={len(page2)}, overlap={len(page1 & page2)}")
+
+    return suite
+
+
+def run_flow_notification_dedup():
+    """Flow 9: One-shot notification dedup — a retried send() adds no row and no second SMS."""
+    suite = TestSuite("FLOW-09: جلوگیری از اعلان/پیامک تکراری")
+    print(f"\n{'='*60}\n  {suite.name}\n{'='*60}")
+
+    import main  # noqa: F401 — registers every model mapper for in-process service calls
+    from fastapi import BackgroundTasks
+    from config.database import SessionLocal
+    from modules.notification.service import notification_service
+
+    c = get_session(CUSTOMER3_MOBILE)
+    uid = get_user_id(CUSTOMER3_MOBILE)
+    if not uid:
+        suite.add("FLOW-09-00", "کاربر تست پیدا نشد", False)
+        return suite
+
+    ntype = "PAYMENT_SUCCESS"
+    saved_pref = db_query("""
+        SELECT sms_enabled, in_app_enabled, email_enabled FROM notification_preferences
+        WHERE user_id = :uid AND notification_type = :nt
+    """, {"uid": uid, "nt": ntype})
+    run_tag = f"TSDD-{int(time.time())}"
+
+    def send_twice(ref_id, in_app):
+        """Set the preference, then send the same order_paid event twice in one session."""
+        tasks = BackgroundTasks()
+        with SessionLocal() as db:
+            notification_service.save_preferences(
+                db, uid, {ntype: {"sms": True, "in_app": in_app, "email": False}})
+            results = [
+                notification_service.send(
+                    db, uid, ntype, title=ref_id, body="تست تکرار",
+                    sms_text="تست تکرار", reference_type="order_paid", reference_id=ref_id,
+                    background_tasks=tasks,
+                )
+                for _ in range(2)
+            ]
+            db.commit()
+        rows = db_query("""
+            SELECT channel, is_read FROM notifications
+            WHERE user_id = :uid AND reference_type = 'order_paid' AND reference_id = :ref
+        """, {"uid": uid, "ref": ref_id})
+        # Tasks are only queued, never run: no real SMS leaves the test
+        return results, rows, len(tasks.tasks)
+
+    try:
+        # In-app on: second send hits uq_notification_dedup
+        ref_on = f"{run_tag}-on"
+        (first, second), rows, sms_queued = send_twice(ref_on, in_app=True)
+        suite.add("FLOW-09-01", "in-app روشن: ارسال اول id برمی‌گرداند، تکرار None",
+                  isinstance(first, int) and second is None, f"first={first}, second={second}")
+        suite.add("FLOW-09-02", "in-app روشن: فقط یک ردیف اعلان",
+                  len(rows) == 1 and rows[0][0] == "IN_APP", f"rows={rows}")
+        suite.add("FLOW-09-03", "in-app روشن: فقط یک پیامک در صف",
+                  sms_queued == 1, f"queued={sms_queued}")
+
+        # In-app off: a hidden SMS record still deduplicates the retry
+        r = _get(c, "/notifications/api/unread-count")
+        unread_before = r.json().get("count") if r.status_code == 200 else None
+
+        ref_off = f"{run_tag}-off"
+        (first, second), rows, sms_queued = send_twice(ref_off, in_app=False)
+        suite.add("FLOW-09-04", "in-app خاموش: هیچ id برگردانده نمی‌شود",
+                  first is None and second is None, f"first={first}, second={second}")
+        suite.add("FLOW-09-05", "in-app خاموش: دقیقاً یک ردیف پنهان SMS (خوانده‌شده)",
+                  rows == [("SMS", True)], f"rows={rows}")
+        suite.add("FLOW-09-06", "in-app خاموش: تکرار پیامکی در صف نمی‌گذارد",
+                  sms_queued == 1, f"queued={sms_queued}")
+
+        r = _get(c, "/notifications")
+        suite.add("FLOW-09-07", "ردیف پنهان در مرکز اعلان‌ها نمایش داده نمی‌شود",
+                  r.status_code == 200 and ref_off not in r.text, f"status={r.status_code}")
+
+        r = _get(c, "/notifications/api/unread-count")
+        unread_after = r.json().get("count") if r.status_code == 200 else None
+        suite.add("FLOW-09-08", "ردیف پنهان در شمارنده خوانده‌نشده حساب نمی‌شود",
+                  unread_before is not None and unread_after == unread_before,
+                  f"before={unread_before}, after={unread_after}")
+    finally:
+        db_exec("DELETE FROM notifications WHERE user_id = :uid AND reference_id LIKE :tag",
+                {"uid": uid, "tag": f"{run_tag}-%"})
+        if saved_pref:
+            sms, in_app, email = saved_pref[0]
+            db_exec("""
+                UPDATE notification_preferences
+                SET sms_enabled = :sms, in_app_enabled = :in_app, email_enabled = :email
+                WHERE user_id = :uid AND notification_type = :nt
+            """, {"sms": sms, "in_app": in_app, "email": email, "uid": uid, "nt": ntype})
+        else:
+            db_exec("DELETE FROM notification_preferences WHERE user_id = :uid AND notification_type = :nt",
+                    {"uid": uid, "nt": ntype})
+
+    return suite
+
+
 # ─── Main ────────────────────────────────────────────────────
 
 def main():
@@ -1561,6 +1879,9 @@ def main():
         run_flow_dealer_api_sale,
         run_flow_customer_pos,
         run_flow_ticket,
+        run_flow_reconciliation,
+        run_flow_keyset_pagination,
+        run_flow_notification_dedup,
     ]
 
     for runner in runners: